@@ -3,6 +3,29 @@
 """
 from typing import Optional
 
+# Переводы китайских названий атрибутов (строятся один раз при импорте)
+ATTRIBUTE_NAME_TRANSLATIONS = {
+    '尺码': 'Размер',
+    '颜色': 'Цвет',
+    '性别': 'Пол',
+    '材质': 'Материал',
+    '品牌': 'Бренд',
+    '款式': 'Стиль',
+    '货号': 'Артикул',
+    '上市时间': 'Дата выпуска',
+    '鞋头': 'Форма носка',
+    '闭合方式': 'Тип закрытия',
+    '适用场景': 'Назначение',
+    '适用季节': 'Сезон',
+    '鞋底材质': 'Материал подошвы',
+    '跟高': 'Высота каблука',
+    '筒高': 'Высота голенища',
+    '厚薄': 'Толщина',
+    '图案': 'Рисунок',
+    '流行元素': 'Трендовые элементы',
+    '适用年龄': 'Возраст',
+}
+
 
 def map_category_to_wordpress(poizon_category: str, product_title: str = "") -> str:
     """
@@ -30,27 +53,5 @@ def translate_attribute_name(chinese_name: str) -> str:
     Returns:
         Название на русском
     """
-    translations = {
-        '尺码': 'Размер',
-        '颜色': 'Цвет',
-        '性别': 'Пол',
-        '材质': 'Материал',
-        '品牌': 'Бренд',
-        '款式': 'Стиль',
-        '货号': 'Артикул',
-        '上市时间': 'Дата выпуска',
-        '鞋头': 'Форма носка',
-        '闭合方式': 'Тип закрытия',
-        '适用场景': 'Назначение',
-        '适用季节': 'Сезон',
-        '鞋底材质': 'Материал подошвы',
-        '跟高': 'Высота каблука',
-        '筒高': 'Высота голенища',
-        '厚薄': 'Толщина',
-        '图案': 'Рисунок',
-        '流行元素': 'Трендовые элементы',
-        '适用年龄': 'Возраст',
-    }
-    
-    return translations.get(chinese_name, chinese_name)
+    return ATTRIBUTE_NAME_TRANSLATIONS.get(chinese_name, chinese_name)
 
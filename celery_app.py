@@ -1,20 +1,16 @@
 import os
 from celery import Celery
-from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
-
-# Get Redis URL from environment, with a default for local development
-redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# REDIS_URL is read (after loading .env) in redis_store, shared by all modules
+from redis_store import REDIS_URL
 
 # Create the Celery application instance
 # The first argument is the name of the current module.
 # The 'broker' and 'backend' arguments specify the URL of the message broker (Redis).
 celery = Celery(
     'web_app',
-    broker=redis_url,
-    backend=redis_url,
+    broker=REDIS_URL,
+    backend=REDIS_URL,
     include=['tasks']  # Look for tasks in tasks.py
 )
 
@@ -30,6 +26,13 @@ celery.conf.update(
     # Acknowledge tasks after they have been executed, not before.
     # This means if a worker crashes, the task will be re-queued.
     task_acks_late=True,
+    # Periodic tasks, run by `celery -A celery_app.celery beat`
+    beat_schedule={
+        'refresh-spu-index': {
+            'task': 'tasks.refresh_spu_index_task',
+            'schedule': float(os.getenv('SPU_INDEX_REFRESH_INTERVAL', 6 * 60 * 60)),
+        },
+    },
 )
 
 if __name__ == '__main__':
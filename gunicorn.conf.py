@@ -23,6 +23,10 @@ workers = multiprocessing.cpu_count() * 2 + 1
 # 'gevent' must be installed (pip install gevent).
 worker_class = "gevent"
 
+# Max simultaneous connections per gevent worker. Requests mostly wait on
+# Poizon/WooCommerce/GigaChat, so one worker can keep many of them in flight.
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
 # --- Logging ---
 # Log to stdout and stderr. Hosting platforms typically collect these logs.
 accesslog = "-"
@@ -36,3 +40,10 @@ proc_name = "seo-poizon-wordpress"
 # Workers silent for more than this many seconds are killed and restarted.
 # Increased to 120 seconds because GigaChat processing can be slow.
 timeout = 120
+
+
+# --- Worker Hooks ---
+def post_worker_init(worker):
+    """Initialize API clients and warm the response cache once per worker."""
+    from web_app import init_app_services
+    init_app_services()
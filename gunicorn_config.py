@@ -17,7 +17,12 @@ BASE_DIR = Path(__file__).parent
 workers = multiprocessing.cpu_count() * 2 + 1
 
 # Класс worker'ов
-worker_class = 'sync'
+# gevent: запросы почти всё время ждут ответа Poizon/WooCommerce/GigaChat,
+# поэтому один worker обслуживает много запросов одновременно (sync - только один)
+worker_class = 'gevent'
+
+# Максимум одновременных соединений на один gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
 
 # Биндинг
 bind = '127.0.0.1:8000'
@@ -54,3 +59,9 @@ limit_request_field_size = 8190
 # Имя процесса
 proc_name = 'nesivtoroi-tech'
 
+
+
+# Инициализация клиентов API и прогрев кэша ответов в каждом worker'е
+def post_worker_init(worker):
+    from web_app import init_app_services
+    init_app_services()
@@ -0,0 +1,41 @@
+"""
+Fast JSON (de)serialization with graceful fallback.
+
+Uses orjson when available, then ujson, then the stdlib json module.
+dumps() always returns UTF-8 bytes without ASCII escaping, loads() accepts
+bytes or str, so callers do not need to care which backend is active.
+dumps() takes an optional default callable for types the backend cannot
+serialize natively, with the same meaning as in json.dumps.
+"""
+try:
+    import orjson
+
+    BACKEND = 'orjson'
+    JSONDecodeError = orjson.JSONDecodeError
+    dumps = orjson.dumps
+    loads = orjson.loads
+
+except ImportError:
+    try:
+        import ujson
+
+        BACKEND = 'ujson'
+        JSONDecodeError = ujson.JSONDecodeError
+
+        def dumps(obj, default=None) -> bytes:
+            if default is None:
+                return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+            return ujson.dumps(obj, ensure_ascii=False, default=default).encode('utf-8')
+
+        loads = ujson.loads
+
+    except ImportError:
+        import json
+
+        BACKEND = 'json'
+        JSONDecodeError = json.JSONDecodeError
+
+        def dumps(obj, default=None) -> bytes:
+            return json.dumps(obj, ensure_ascii=False, default=default).encode('utf-8')
+
+        loads = json.loads
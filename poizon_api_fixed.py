@@ -21,10 +21,17 @@ API Documentation: https://poizon-api.com/docs
 """
 import os
 import logging
+import random
+import re
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 import urllib3
+import json_codec
+from category_mapper import map_category_to_wordpress, translate_attribute_name
 
 # Отключаем SSL предупреждения для работы с API
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -33,6 +40,66 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Проекция полей (fields=...) для списков брендов/категорий.
+# Поддержка параметра на стороне poizon-api.com не документирована, поэтому
+# по умолчанию выключено; включается POIZON_FIELDS_PROJECTION=true.
+POIZON_FIELDS_PROJECTION = os.getenv('POIZON_FIELDS_PROJECTION', 'false').lower() == 'true'
+_BRAND_FIELDS = 'id,name,logo'
+_CATEGORY_FIELDS = 'id,name,rootId,level'
+
+# Китайские служебные префиксы в 【】 скобках (【定制球鞋】, 【联名款】 и т.д.)
+_TITLE_PREFIX_RE = re.compile(r'【[^】]+】')
+
+# Лимит частоты запросов к Poizon API на процесс (запросов в секунду, 0 - без лимита)
+POIZON_RPS = float(os.getenv('POIZON_RPS', '10'))
+# Сколько раз повторять запрос, отклоненный по лимиту (429 / "rate limit" / "quota")
+POIZON_MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """
+    Потокобезопасный token bucket.
+    
+    В отличие от фиксированной паузы после каждого запроса, ждет только тогда,
+    когда фактическая частота запросов превышает rate (допускает всплеск до capacity).
+    """
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Забирает один токен, при необходимости ждет его появления"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Один лимитер на процесс - общий для всех клиентов и потоков
+_rate_limiter = TokenBucket(POIZON_RPS)
+
+
+def _is_rate_limited(response) -> bool:
+    """Ответ означает превышение лимита API (429 или текст про rate limit / quota)"""
+    if response.status_code == 429:
+        return True
+    if response.status_code < 400:
+        return False
+    text = response.text[:500].lower()
+    return 'rate limit' in text or 'quota' in text
+
 
 class PoisonAPIClientFixed:
     """
@@ -57,8 +124,13 @@ class PoisonAPIClientFixed:
         ...     print(product['title'])
     """
     
-    def __init__(self):
-        """Инициализация клиента"""
+    def __init__(self, adapter: Optional[HTTPAdapter] = None):
+        """
+        Инициализация клиента
+        
+        Args:
+            adapter: Общий пул соединений процесса (если не передан - создается свой)
+        """
         self.api_key = os.getenv('POIZON_API_KEY')
         self.client_id = os.getenv('POIZON_CLIENT_ID')
         self.base_url = "https://poizon-api.com/api/dewu"
@@ -69,11 +141,36 @@ class PoisonAPIClientFixed:
         self.headers = {
             'x-api-key': self.api_key,
             'client-id': self.client_id,
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive'
         }
         
+        # Общая сессия: TCP/TLS соединения переиспользуются между запросами
+        # (пул рассчитан на параллельные запросы страниц брендов/товаров)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter or HTTPAdapter(pool_connections=10, pool_maxsize=50))
+        
         # Убрано: логи инициализации (дублируются в режиме DEBUG)
     
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Запрос к Poizon API с ограничением частоты и повтором при превышении лимита.
+        
+        Перед каждой попыткой берет токен из общего лимитера; на ответ 429
+        (или с текстом про rate limit / quota) повторяет до POIZON_MAX_RETRIES раз
+        с экспоненциальной паузой со случайным разбросом (или по Retry-After).
+        """
+        for attempt in range(POIZON_MAX_RETRIES + 1):
+            _rate_limiter.acquire()
+            response = self.session.request(method, url, headers=self.headers, timeout=60, **kwargs)
+            if attempt == POIZON_MAX_RETRIES or not _is_rate_limited(response):
+                return response
+            
+            retry_after = response.headers.get('Retry-After', '')
+            delay = float(retry_after) if retry_after.isdigit() else 2 ** attempt + random.uniform(0, 1)
+            logger.warning("Poizon API: превышен лимит (%s), повтор через %.1f с", response.status_code, delay)
+            time.sleep(delay)
+    
     def get_brands(self, limit: int = 100, page: int = 0) -> List[Dict]:
         """
         Получает список брендов.
@@ -88,12 +185,14 @@ class PoisonAPIClientFixed:
         try:
             url = f"{self.base_url}/getBrands"
             data = {"limit": limit, "page": page}
+            if POIZON_FIELDS_PROJECTION:
+                data["fields"] = _BRAND_FIELDS
             
             # Убрано DEBUG: запрос брендов
-            response = requests.post(url, json=data, headers=self.headers, timeout=60)
+            response = self._request('POST', url, json=data)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.loads(response.content)
             brands = result.get('data', [])
             
             logger.info(f"[OK] Загружено брендов: {len(brands)}")
@@ -116,12 +215,14 @@ class PoisonAPIClientFixed:
         try:
             url = f"{self.base_url}/getCategories"
             params = {"lang": lang}
+            if POIZON_FIELDS_PROJECTION:
+                params["fields"] = _CATEGORY_FIELDS
             
             # Убрано DEBUG: запрос категорий
-            response = requests.get(url, params=params, headers=self.headers, timeout=60)
+            response = self._request('GET', url, params=params)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.loads(response.content)
             # API возвращает массив напрямую
             categories = result if isinstance(result, list) else result.get('categories', [])
             
@@ -153,10 +254,10 @@ class PoisonAPIClientFixed:
             }
             
             # Убрано DEBUG: поиск товаров
-            response = requests.get(url, params=params, headers=self.headers, timeout=60)
+            response = self._request('GET', url, params=params)
             response.raise_for_status()
             
-            result = response.json()
+            result = json_codec.loads(response.content)
             # API возвращает ключ productList
             products = result.get('productList') or result.get('list') or []
             
@@ -164,11 +265,11 @@ class PoisonAPIClientFixed:
             if products is None:
                 products = []
             
-            logger.info(f"[OK] Найдено товаров: {len(products)}")
+            logger.info("[OK] Найдено товаров: %s", len(products))
             return products
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка поиска товаров: {e}")
+            logger.error("[ERROR] Ошибка поиска товаров: %s", e)
             return []
     
     def get_product_detail_v3(self, spu_id: int) -> Optional[Dict]:
@@ -185,13 +286,13 @@ class PoisonAPIClientFixed:
             url = f"{self.base_url}/productDetailV3"
             params = {"spuId": spu_id}
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=60)
+            response = self._request('GET', url, params=params)
             response.raise_for_status()
             
-            return response.json()
+            return json_codec.loads(response.content)
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка получения товара {spu_id}: {e}")
+            logger.error("[ERROR] Ошибка получения товара %s: %s", spu_id, e)
             return None
     
     def get_price_info(self, spu_id: int) -> Dict:
@@ -208,16 +309,16 @@ class PoisonAPIClientFixed:
             url = f"{self.base_url}/priceInfo"
             params = {"spuId": spu_id}
             
-            response = requests.get(url, params=params, headers=self.headers, timeout=60)
+            response = self._request('GET', url, params=params)
             
             # Проверка статуса ответа
             if response.status_code == 403:
-                logger.warning(f"⚠️ priceInfo SPU {spu_id}: 403 Forbidden - эндпоинт недоступен или требует дополнительную авторизацию")
+                logger.warning("⚠️ priceInfo SPU %s: 403 Forbidden - эндпоинт недоступен или требует дополнительную авторизацию", spu_id)
                 return {}
             
             response.raise_for_status()
             
-            data = response.json()
+            data = json_codec.loads(response.content)
             # logger.debug(f"  [DEBUG] priceInfo response for SPU {spu_id}: {data}")  # Убрано: слишком много данных
             
             # API возвращает структуру {"skus": {...}}, а НЕ {"data": {"skus": {...}}}
@@ -242,7 +343,7 @@ class PoisonAPIClientFixed:
             return result
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка получения цен {spu_id}: {e}")
+            logger.error("[ERROR] Ошибка получения цен %s: %s", spu_id, e)
             return {}
     
     def get_product_full_info(self, spu_id: int):
@@ -433,7 +534,7 @@ class PoisonAPIClientFixed:
                 
                 # Если размер не найден, используем SKU ID как размер
                 if not size or size == 'None':
-                    logger.warning(f"  SKU {sku_id_str}: размер не найден, используем SKU ID")
+                    logger.warning("  SKU %s: размер не найден, используем SKU ID", sku_id_str)
                     size = sku_id_str
                 
                 # Переводим цвет с китайского на русский
@@ -596,13 +697,11 @@ class PoisonAPIClientFixed:
             # Убрано DEBUG: создано вариаций
             if variations:
                 sizes = [v['size'] for v in variations[:5]]
-                logger.info(f"  Примеры размеров: {sizes}")
+                logger.info("  Примеры размеров: %s", sizes)
             else:
-                logger.warning(f"  ВАРИАЦИЙ НЕТ! prices={len(prices)}, skus_array={len(skus_array)}, sale_properties={len(sale_properties)}")
+                logger.warning("  ВАРИАЦИЙ НЕТ! prices=%s, skus_array=%s, sale_properties=%s", len(prices), len(skus_array), len(sale_properties))
             
             # Формируем атрибуты (переводим китайские названия)
-            from category_mapper import translate_attribute_name
-            
             attributes = {}
             for prop in sale_properties:
                 attr_name = prop.get('name', '')
@@ -630,27 +729,19 @@ class PoisonAPIClientFixed:
             if not brand_name:
                 title = detail.get('title', '')
                 # Убираем китайские служебные префиксы типа 【定制球鞋】, 【联名款】 и т.д.
-                import re
-                # Удаляем текст в 【】 скобках
-                cleaned_title = re.sub(r'【[^】]+】', '', title).strip()
+                cleaned_title = _TITLE_PREFIX_RE.sub('', title).strip()
                 # Берем первое слово после очистки
                 brand_name = cleaned_title.split()[0] if cleaned_title else 'Unknown'
-                logger.info(f"⚠️ Бренд не найден в API, извлечен из названия: '{brand_name}'")
+                logger.info("⚠️ Бренд не найден в API, извлечен из названия: '%s'", brand_name)
             else:
-                logger.info(f"✅ Бренд из brandRootInfo: '{brand_name}'")
+                logger.info("✅ Бренд из brandRootInfo: '%s'", brand_name)
             
             # Маппим категорию в WordPress категорию
-            # Перезагружаем модуль category_mapper для актуальных изменений
-            import importlib
-            import category_mapper
-            importlib.reload(category_mapper)
-            from category_mapper import map_category_to_wordpress
-            
             poizon_category = detail.get('categoryName', '')
             wordpress_category = map_category_to_wordpress(poizon_category, detail.get('title', ''))
             
-            logger.info(f"Категория Poizon: '{poizon_category}'")
-            logger.info(f"Категория WordPress: '{wordpress_category}'")
+            logger.info("Категория Poizon: '%s'", poizon_category)
+            logger.info("Категория WordPress: '%s'", wordpress_category)
             
             # Создаем объект товара (простой dict вместо dataclass)
             from types import SimpleNamespace
@@ -671,11 +762,11 @@ class PoisonAPIClientFixed:
                 description=detail.get('desc', '')
             )
             
-            logger.info(f"[OK] Загружена полная информация о товаре {spu_id}")
+            logger.info("[OK] Загружена полная информация о товаре %s", spu_id)
             return product
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка загрузки полной информации {spu_id}: {e}")
+            logger.error("[ERROR] Ошибка загрузки полной информации %s: %s", spu_id, e)
             return None
 
 
@@ -12,16 +12,24 @@
 
 """
 import os
+import functools
 import logging
+import certifi
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
 from dataclasses import dataclass
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import re
+import string
+import threading
 import time
-import time
+import unicodedata
+
+import json_codec
 
 # Импортируем рабочий клиент Poizon API
 from poizon_api_fixed import PoisonAPIClientFixed
@@ -29,17 +37,86 @@ from poizon_api_fixed import PoisonAPIClientFixed
 # Импортируем обработчик изображений
 from image_processor import resize_image_to_square
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('poizon_sync_service.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# Логирование настраивает запускающий процесс (web_app, Celery или CLI ниже)
 logger = logging.getLogger(__name__)
 
+# Транслитерация для русских названий атрибутов (slug)
+_TRANSLIT_TABLE = str.maketrans({
+    'Ц': 'ts', 'ц': 'ts', 'Ч': 'ch', 'ч': 'ch', 'Ш': 'sh', 'ш': 'sh',
+    'Щ': 'sch', 'щ': 'sch', 'Ю': 'yu', 'ю': 'yu', 'Я': 'ya', 'я': 'ya',
+    'А': 'a', 'а': 'a', 'Б': 'b', 'б': 'b', 'В': 'v', 'в': 'v',
+    'Г': 'g', 'г': 'g', 'Д': 'd', 'д': 'd', 'Е': 'e', 'е': 'e',
+    'Ё': 'yo', 'ё': 'yo', 'Ж': 'zh', 'ж': 'zh', 'З': 'z', 'з': 'z',
+    'И': 'i', 'и': 'i', 'Й': 'y', 'й': 'y', 'К': 'k', 'к': 'k',
+    'Л': 'l', 'л': 'l', 'М': 'm', 'м': 'm', 'Н': 'n', 'н': 'n',
+    'О': 'o', 'о': 'o', 'П': 'p', 'п': 'p', 'Р': 'r', 'р': 'r',
+    'С': 's', 'с': 's', 'Т': 't', 'т': 't', 'У': 'u', 'у': 'u',
+    'Ф': 'f', 'ф': 'f', 'Х': 'h', 'х': 'h', 'Ы': 'y', 'ы': 'y',
+    'Э': 'e', 'э': 'e', 'Ъ': '', 'ъ': '', 'Ь': '', 'ь': ''
+})
+
+# Предкомпилированные регулярные выражения (используются на каждый товар)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Символы, которые clean_chinese_final оставляет: латиница, цифры, пробел и - ' . ,
+_ASCII_KEPT = string.ascii_letters + string.digits + " -'.,"
+
+# Чисто ASCII текст (частый случай) чистится через bytes.translate с удалением -
+# это проход в C без поиска по словарю на каждый символ
+_ASCII_DELETE_BYTES = bytes(code for code in range(128) if chr(code) not in _ASCII_KEPT)
+
+# Остальной текст: одна регулярка удаляет всё, кроме оставляемых символов
+# и полноширинных Ａ-Ｚ, ａ-ｚ, ０-９, которые затем приводятся к обычным ASCII
+_NOT_KEPT_RE = re.compile(r"[^A-Za-z0-9 \-'.,Ａ-Ｚａ-ｚ０-９]+")
+_FULLWIDTH_TABLE = {
+    code: code - 0xFEE0
+    for start, end in ((0xFF21, 0xFF3A), (0xFF41, 0xFF5A), (0xFF10, 0xFF19))
+    for code in range(start, end + 1)
+}
+
+_SLUG_INVALID_RE = re.compile(r'[^a-z0-9-]')
+_SLUG_DASHES_RE = re.compile(r'-+')
+_FILENAME_INVALID_RE = re.compile(r'[^\w\s.-]')
+_FILENAME_SEPARATORS_RE = re.compile(r'[-\s]+')
+
+
+def clean_chinese_final(text: str) -> str:
+    """ИЗВЛЕКАЕТ только латиницу, цифры и базовые символы из текста"""
+    if not text:
+        return ""
+    
+    # Оставляем только латиницу, цифры и базовые символы, полноширинные
+    # буквы и цифры приводим к обычным
+    if text.isascii():
+        text = text.encode('ascii').translate(None, _ASCII_DELETE_BYTES).decode('ascii')
+    else:
+        text = _NOT_KEPT_RE.sub('', text)
+        if not text.isascii():
+            text = text.translate(_FULLWIDTH_TABLE)
+    
+    # Убираем множественные пробелы
+    text = _WHITESPACE_RE.sub(' ', text).strip()
+    text = text.strip(' -.,')
+    
+    # Если осталось меньше 3 символов - пустая строка
+    if not text or len(text) < 3:
+        return ""
+    
+    return text
+
+
+@functools.lru_cache(maxsize=1024)
+def _clean_brand(brand: str) -> str:
+    """clean_chinese_final для бренда: бренды повторяются от товара к товару"""
+    return clean_chinese_final(brand)
+
+
+# Описательные слова: ключевое слово с ними не считается названием модели (для тегов)
+_TAG_DESCRIPTIVE_TERMS = ('кроссовки', 'обувь', 'ботинки', 'сандалии', 'сланцы',
+                          'женская', 'мужская', 'детская', 'унисекс',
+                          'белый', 'черный', 'красный', 'синий', 'зеленый', 'желтый',
+                          'спортивная', 'повседневная', 'беговая', 'баскетбольная')
+
 
 @dataclass
 class SyncSettings:
@@ -108,6 +185,24 @@ class PoisonProduct:
     description: str = ""
 
 
+# Максимум объектов в одном batch запросе WooCommerce REST API
+WC_BATCH_SIZE = 100
+
+# Товаров, синхронизируемых параллельно в sync_all_products (ожидание API
+# перекрывается; частоту запросов к Poizon ограничивает сам клиент)
+SYNC_WORKERS = int(os.getenv('SYNC_WORKERS', 8))
+
+
+def _variation_unchanged(wc_var: Dict, regular_price: str, stock_quantity) -> bool:
+    """True, если у вариации WooCommerce уже эти цена и остаток (запись не нужна)"""
+    return wc_var.get('regular_price') == regular_price and wc_var.get('stock_quantity') == stock_quantity
+
+
+def _variation_price_update(variation_id: int, regular_price: str, stock_quantity) -> Dict:
+    """Элемент 'update' для /variations/batch: только изменяемые поля"""
+    return {'id': variation_id, 'regular_price': regular_price, 'stock_quantity': stock_quantity}
+
+
 class WooCommerceService:
     """
     Клиент для работы с WordPress WooCommerce REST API.
@@ -137,7 +232,7 @@ class WooCommerceService:
         ValueError: Если не указаны обязательные переменные окружения
     """
     
-    def __init__(self):
+    def __init__(self, adapter: Optional[HTTPAdapter] = None):
         """
         Инициализирует клиент WooCommerce и загружает категории.
         
@@ -145,6 +240,11 @@ class WooCommerceService:
             - WC_URL: адрес WordPress сайта
             - WC_CONSUMER_KEY: ключ API WooCommerce
             - WC_CONSUMER_SECRET: секрет API WooCommerce
+            - WC_CA_BUNDLE: свой CA сертификат (для самоподписанного сертификата сайта)
+            - WC_SSL_VERIFY: false - отключить проверку сертификата
+        
+        Args:
+            adapter: Общий пул соединений процесса (если не передан - создается свой)
         """
         load_dotenv()
         
@@ -161,6 +261,24 @@ class WooCommerceService:
         
         self.auth = (self.consumer_key, self.consumer_secret)
         
+        # Общая HTTP сессия: keep-alive соединения к WordPress переиспользуются
+        # между запросами и потоками (без TCP+TLS рукопожатия на каждый вызов)
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        # Проверка сертификата включена: без нее urllib3 не переиспользует TLS сессии
+        # и каждое новое соединение проходит полное рукопожатие
+        if os.getenv('WC_SSL_VERIFY', 'true').lower() in ('0', 'false', 'no'):
+            self.session.verify = False
+        else:
+            self.session.verify = os.getenv('WC_CA_BUNDLE') or certifi.where()
+        if adapter is None:
+            adapter = HTTPAdapter(
+                pool_connections=int(os.getenv('WC_POOL_CONNECTIONS', 20)),
+                pool_maxsize=int(os.getenv('WC_POOL_MAXSIZE', 50))
+            )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
         # Авторизация для загрузки изображений (WordPress REST API)
         if self.wp_user and self.wp_password:
             self.wp_auth = (self.wp_user, self.wp_password)
@@ -172,6 +290,9 @@ class WooCommerceService:
         self.category_cache = {}  # Кеш категорий {name: id}
         self.category_tree = {}  # Дерево категорий {id: {name, parent, slug}}
         self.attribute_cache = {}  # Кеш атрибутов {name: {id, slug}}
+        # sync_all_products создает товары в нескольких потоках: проверка кеша
+        # и создание атрибута должны быть атомарными, иначе атрибут создают все сразу
+        self._attribute_lock = threading.Lock()
         self.term_cache = {}  # Кеш терминов атрибутов {(attr_id, term_name): {id, name, slug}}
         
         # Загружаем существующие категории и атрибуты при инициализации
@@ -186,10 +307,10 @@ class WooCommerceService:
             url = f"{self.url}/wp-json/wc/v3/products/categories"
             params = {'per_page': 100}  # Загружаем до 100 категорий
             
-            response = requests.get(url, auth=self.auth, params=params, verify=False, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
-                categories = response.json()
+                categories = json_codec.loads(response.content)
                 
                 # Строим дерево категорий
                 for cat in categories:
@@ -234,10 +355,10 @@ class WooCommerceService:
         try:
             url = f"{self.url}/wp-json/wc/v3/products/attributes"
             
-            response = requests.get(url, auth=self.auth, verify=False, timeout=30)
+            response = self.session.get(url, timeout=30)
             
             if response.status_code == 200:
-                attributes = response.json()
+                attributes = json_codec.loads(response.content)
                 
                 for attr in attributes:
                     attr_id = attr['id']
@@ -271,36 +392,23 @@ class WooCommerceService:
             # Убрано DEBUG: атрибут уже существует
             return self.attribute_cache[attribute_name]
         
-        # Создаем новый атрибут
+        with self._attribute_lock:
+            # Пока ждали блокировку, атрибут мог создать другой поток
+            if attribute_name in self.attribute_cache:
+                return self.attribute_cache[attribute_name]
+            return self._create_attribute(attribute_name)
+    
+    def _create_attribute(self, attribute_name: str) -> Optional[Dict]:
+        """Создает глобальный атрибут (вызывается под _attribute_lock)"""
         try:
             url = f"{self.url}/wp-json/wc/v3/products/attributes"
             
-            # Генерируем slug из имени
-            import re
-            import unicodedata
-            
-            # Транслитерация для русских названий
-            translit_map = {
-                'Ц': 'ts', 'ц': 'ts', 'Ч': 'ch', 'ч': 'ch', 'Ш': 'sh', 'ш': 'sh',
-                'Щ': 'sch', 'щ': 'sch', 'Ю': 'yu', 'ю': 'yu', 'Я': 'ya', 'я': 'ya',
-                'А': 'a', 'а': 'a', 'Б': 'b', 'б': 'b', 'В': 'v', 'в': 'v',
-                'Г': 'g', 'г': 'g', 'Д': 'd', 'д': 'd', 'Е': 'e', 'е': 'e',
-                'Ё': 'yo', 'ё': 'yo', 'Ж': 'zh', 'ж': 'zh', 'З': 'z', 'з': 'z',
-                'И': 'i', 'и': 'i', 'Й': 'y', 'й': 'y', 'К': 'k', 'к': 'k',
-                'Л': 'l', 'л': 'l', 'М': 'm', 'м': 'm', 'Н': 'n', 'н': 'n',
-                'О': 'o', 'о': 'o', 'П': 'p', 'п': 'p', 'Р': 'r', 'р': 'r',
-                'С': 's', 'с': 's', 'Т': 't', 'т': 't', 'У': 'u', 'у': 'u',
-                'Ф': 'f', 'ф': 'f', 'Х': 'h', 'х': 'h', 'Ы': 'y', 'ы': 'y',
-                'Э': 'e', 'э': 'e', 'Ъ': '', 'ъ': '', 'Ь': '', 'ь': ''
-            }
-            
-            slug = attribute_name
-            for cyr, lat in translit_map.items():
-                slug = slug.replace(cyr, lat)
+            # Генерируем slug из имени (транслитерация для русских названий)
+            slug = attribute_name.translate(_TRANSLIT_TABLE)
             
             # Убираем все кроме букв, цифр и дефисов
-            slug = re.sub(r'[^a-z0-9-]', '-', slug.lower())
-            slug = re.sub(r'-+', '-', slug).strip('-')
+            slug = _SLUG_INVALID_RE.sub('-', slug.lower())
+            slug = _SLUG_DASHES_RE.sub('-', slug).strip('-')
             
             data = {
                 'name': attribute_name,
@@ -310,10 +418,10 @@ class WooCommerceService:
                 'has_archives': False
             }
             
-            response = requests.post(url, auth=self.auth, json=data, verify=False, timeout=30)
+            response = self.session.post(url, json=data, timeout=30)
             
             if response.status_code == 201:
-                result = response.json()
+                result = json_codec.loads(response.content)
                 attr_info = {
                     'id': result['id'],
                     'slug': result['slug']
@@ -321,6 +429,18 @@ class WooCommerceService:
                 self.attribute_cache[attribute_name] = attr_info
                 logger.info(f"[OK] Создан глобальный атрибут '{attribute_name}': ID={result['id']}, slug='{result['slug']}'")
                 return attr_info
+            elif response.status_code == 400:
+                # Атрибут со slug уже есть (создан другим процессом или вручную) -
+                # перечитываем атрибуты из WordPress
+                logger.warning(f"Атрибут '{attribute_name}' не создан ({response.text}), перезагружаем атрибуты")
+                self._load_attributes()
+                # Название может отличаться от нашего, тогда ищем по slug (WooCommerce добавляет pa_)
+                attr_info = self.attribute_cache.get(attribute_name) or next(
+                    (info for info in self.attribute_cache.values() if info['slug'] in (slug, f'pa_{slug}')), None
+                )
+                if attr_info:
+                    self.attribute_cache[attribute_name] = attr_info
+                return attr_info
             else:
                 logger.error(f"Ошибка создания атрибута '{attribute_name}': {response.status_code}")
                 logger.error(f"Ответ: {response.text}")
@@ -351,9 +471,9 @@ class WooCommerceService:
             url = f"{self.url}/wp-json/wc/v3/products/attributes/{attribute_id}/terms"
             
             # Проверяем существует ли такой термин
-            check_response = requests.get(url, auth=self.auth, params={'search': term_name}, verify=False, timeout=30)
+            check_response = self.session.get(url, params={'search': term_name}, timeout=30)
             if check_response.status_code == 200:
-                existing = check_response.json()
+                existing = json_codec.loads(check_response.content)
                 for term in existing:
                     if term['name'] == term_name:
                         result = {
@@ -371,10 +491,10 @@ class WooCommerceService:
                 'name': term_name
             }
             
-            response = requests.post(url, auth=self.auth, json=data, verify=False, timeout=30)
+            response = self.session.post(url, json=data, timeout=30)
             
             if response.status_code == 201:
-                result_data = response.json()
+                result_data = json_codec.loads(response.content)
                 result = {
                     'id': result_data['id'],
                     'name': result_data['name'],
@@ -386,9 +506,9 @@ class WooCommerceService:
                 return result
             elif response.status_code == 400:
                 # Возможно термин уже существует, ищем его
-                check_response = requests.get(url, auth=self.auth, verify=False, timeout=30)
+                check_response = self.session.get(url, timeout=30)
                 if check_response.status_code == 200:
-                    all_terms = check_response.json()
+                    all_terms = json_codec.loads(check_response.content)
                     for term in all_terms:
                         if term['name'] == term_name:
                             result = {
@@ -441,12 +561,13 @@ class WooCommerceService:
         logger.info(f"ВАЖНО: Убедитесь, что в WordPress существует категория '{category_path}'")
         return 0
     
-    def get_all_products(self, limit: int = 100) -> List[Dict]:
+    def get_all_products(self, limit: int = 100, fields: Optional[List[str]] = None) -> List[Dict]:
         """
         Получает все товары из WordPress (с пагинацией).
         
         Args:
             limit: Максимальное количество товаров на странице
+            fields: Загрузить только эти поля товаров (_fields), по умолчанию - все
             
         Returns:
             Список товаров
@@ -462,11 +583,13 @@ class WooCommerceService:
                     'page': page,
                     'type': 'variable'  # Только вариативные товары
                 }
+                if fields:
+                    params['_fields'] = ','.join(fields)
                 
-                response = requests.get(url, auth=self.auth, params=params, verify=False, timeout=30)
+                response = self.session.get(url, params=params, timeout=30)
                 
                 if response.status_code == 200:
-                    products = response.json()
+                    products = json_codec.loads(response.content)
                     if not products:
                         break
                     
@@ -504,10 +627,10 @@ class WooCommerceService:
             url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations"
             params = {'per_page': 100}
             
-            response = requests.get(url, auth=self.auth, params=params, verify=False, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
-                variations = response.json()
+                variations = json_codec.loads(response.content)
                 # Убрано DEBUG: найдено вариаций
                 return variations
             else:
@@ -518,6 +641,44 @@ class WooCommerceService:
             logger.error(f"Ошибка получения вариаций: {e}")
             return []
     
+    def get_products_by_ids(self, product_ids: List[int], fields: Optional[List[str]] = None) -> Dict[int, Dict]:
+        """
+        Загружает товары пачками через ?include=id1,id2,...
+        
+        Вместо N запросов /products/{id} делает ceil(N/100) запросов.
+        Ошибка одной пачки не прерывает остальные - отсутствующие товары
+        вызывающий код догрузит по одному.
+        
+        Args:
+            product_ids: ID товаров
+            fields: Загрузить только эти поля товаров (_fields, 'id' добавляется
+                    автоматически), по умолчанию - все. Описания и изображения
+                    составляют большую часть ответа
+        
+        Returns:
+            Словарь {ID товара: данные товара}
+        """
+        url = f"{self.url}/wp-json/wc/v3/products"
+        products_by_id = {}
+        params = {'per_page': WC_BATCH_SIZE}
+        if fields:
+            params['_fields'] = ','.join(dict.fromkeys(['id', *fields]))
+        
+        for start in range(0, len(product_ids), WC_BATCH_SIZE):
+            chunk = product_ids[start:start + WC_BATCH_SIZE]
+            try:
+                response = self.session.get(
+                    url,
+                    params={**params, 'include': ','.join(map(str, chunk))},
+                    timeout=30
+                )
+                response.raise_for_status()
+                products_by_id.update({p['id']: p for p in json_codec.loads(response.content)})
+            except Exception as e:
+                logger.warning("Не удалось загрузить пачку товаров WordPress (%s шт.): %s", len(chunk), e)
+        
+        return products_by_id
+    
     def product_exists(self, sku: str) -> Optional[int]:
         """
         Проверяет существует ли товар с таким SKU.
@@ -532,16 +693,16 @@ class WooCommerceService:
             url = f"{self.url}/wp-json/wc/v3/products"
             params = {'sku': sku}
             
-            response = requests.get(url, auth=self.auth, params=params, verify=False, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
             
-            products = response.json()
+            products = json_codec.loads(response.content)
             if products:
                 return products[0]['id']
             return None
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка проверки товара {sku}: {e}")
+            logger.error("[ERROR] Ошибка проверки товара %s: %s", sku, e)
             return None
     
     def create_product(self, product: PoisonProduct, settings: SyncSettings = None) -> Optional[int]:
@@ -599,9 +760,11 @@ class WooCommerceService:
                 kw_list = [kw.strip() for kw in keywords.split(';') if kw.strip()]
                 
                 # Ищем модель: пропускаем бренд и берём только короткие названия (не описательные)
+                brand_lower = product.brand.lower() if product.brand else None
                 for kw in kw_list[:5]:  # Проверяем первые 5 ключевых слов
+                    kw_lower = kw.lower()
                     # Пропускаем бренд (уже добавлен)
-                    if product.brand and kw.lower() == product.brand.lower():
+                    if kw_lower == brand_lower:
                         continue
                     
                     # Пропускаем длинные описательные фразы (кроссовки, обувь, беговые и т.д.)
@@ -609,11 +772,7 @@ class WooCommerceService:
                         continue
                     
                     # Пропускаем очевидные описательные термины
-                    descriptive_terms = ['кроссовки', 'обувь', 'ботинки', 'сандалии', 'сланцы', 
-                                       'женская', 'мужская', 'детская', 'унисекс',
-                                       'белый', 'черный', 'красный', 'синий', 'зеленый', 'желтый',
-                                       'спортивная', 'повседневная', 'беговая', 'баскетбольная']
-                    if any(term in kw.lower() for term in descriptive_terms):
+                    if any(term in kw_lower for term in _TAG_DESCRIPTIVE_TERMS):
                         continue
                     
                     # Если дошли сюда - это скорее всего название модели
@@ -622,69 +781,33 @@ class WooCommerceService:
             
             # Используем SEO title если есть, иначе обычный title
             product_name = getattr(product, 'seo_title', product.title) or product.title
-            logger.info(f"Название ДО очистки: {product_name[:100]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Название ДО очистки: {product_name[:100]}")
             
             # КРИТИЧЕСКИ ВАЖНО: Финальная очистка названия от иероглифов!
-            import re
-            
-            def clean_chinese_final(text: str) -> str:
-                """ИЗВЛЕКАЕТ только латиницу, цифры и базовые символы из текста"""
-                if not text:
-                    return ""
-                
-                # НОВЫЙ ПОДХОД: ИЗВЛЕКАЕМ только нужные символы вместо удаления
-                result = []
-                for char in text:
-                    code = ord(char)
-                    # ASCII латиница и цифры
-                    if (0x0041 <= code <= 0x005A or   # A-Z
-                        0x0061 <= code <= 0x007A or   # a-z
-                        0x0030 <= code <= 0x0039 or   # 0-9
-                        code == 0x0020 or              # пробел
-                        code == 0x002D or              # тире -
-                        code == 0x0027 or              # апостроф '
-                        code == 0x002E or              # точка .
-                        code == 0x002C):               # запятая ,
-                        result.append(char)
-                    # Полноширинные латинские (конвертируем в обычные)
-                    elif 0xFF21 <= code <= 0xFF3A:  # Ａ-Ｚ
-                        result.append(chr(code - 0xFEE0))
-                    elif 0xFF41 <= code <= 0xFF5A:  # ａ-ｚ
-                        result.append(chr(code - 0xFEE0))
-                    elif 0xFF10 <= code <= 0xFF19:  # ０-９
-                        result.append(chr(code - 0xFEE0))
-                    # Все остальное игнорируем (иероглифы, спецсимволы)
-                
-                text = ''.join(result)
-                
-                # Убираем множественные пробелы
-                text = re.sub(r'\s+', ' ', text).strip()
-                text = text.strip(' -.,')
-                
-                # Если осталось меньше 3 символов - пустая строка
-                if not text or len(text) < 3:
-                    return ""
-                
-                return text
-            
             # Применяем очистку к названию
             product_name = clean_chinese_final(product_name)
-            logger.info(f"Название ПОСЛЕ очистки: '{product_name}'")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Название ПОСЛЕ очистки: '{product_name}'")
             
             # Очищаем бренд от иероглифов (на случай если он еще содержит их)
-            brand_clean = clean_chinese_final(product.brand) if product.brand else "Brand"
+            brand_clean = _clean_brand(product.brand) if product.brand else "Brand"
             
             # Если после очистки пусто или мусор - используем очищенный бренд + артикул
             if not product_name or len(product_name.strip()) < 3 or product_name.strip() in ['-', '-(', '-(-', '(', ')']:
                 product_name = f"{brand_clean} {product.article_number}".strip() if hasattr(product, 'article_number') and product.article_number else brand_clean
                 logger.warning(f"Название после очистки пустое/мусор, используем бренд+артикул: {product_name}")
             else:
-                # Проверяем что бренд уже есть в названии (не обязательно в начале)
-                if brand_clean.upper() not in product_name.upper():
-                    logger.info(f"Бренд '{brand_clean}' не найден в названии, добавляем")
+                # Проверяем что бренд уже есть в названии (не обязательно в начале).
+                # casefold вместо upper(): корректнее для Unicode, бренд приводим один раз
+                brand_cf = brand_clean.casefold()
+                if brand_cf not in product_name.casefold():
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Бренд '{brand_clean}' не найден в названии, добавляем")
                     product_name = f"{brand_clean} {product_name}"
             
-            logger.info(f"ФИНАЛЬНОЕ название для WordPress: {product_name}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"ФИНАЛЬНОЕ название для WordPress: {product_name}")
             
             # Формируем meta_data
             meta_data = [
@@ -934,12 +1057,17 @@ class WooCommerceService:
             max_retries = 3
             last_error = None
             
+            # Тело сериализуем один раз через json_codec: описания на кириллице
+            # уходят в UTF-8, а не \uXXXX-экранированием stdlib json
+            body = json_codec.dumps(data)
+            headers = {'Content-Type': 'application/json'}
+            
             for attempt in range(max_retries):
                 try:
-                    response = requests.post(url, auth=self.auth, json=data, verify=False, timeout=60)
+                    response = self.session.post(url, data=body, headers=headers, timeout=60)
                     response.raise_for_status()
                     
-                    result = response.json()
+                    result = json_codec.loads(response.content)
                     product_id = result['id']
                     break  # Успешно создали
                     
@@ -949,7 +1077,7 @@ class WooCommerceService:
                     # Логируем детали ошибки
                     if hasattr(e, 'response') and e.response is not None:
                         try:
-                            error_detail = e.response.json()
+                            error_detail = json_codec.loads(e.response.content)
                             logger.error(f"  WordPress ответ: {error_detail}")
                         except:
                             logger.error(f"  WordPress ответ: {e.response.text[:200]}")
@@ -1068,13 +1196,14 @@ class WooCommerceService:
                             'alt': f"{product.brand} {product.title} {color_str} {size_str} размер"
                         }
                 
-                # Отправляем запрос с retry
+                # Отправляем запрос с retry (тело сериализуем один раз, как и для товара)
+                body = json_codec.dumps(var_data)
                 max_retries = 3
                 for attempt in range(max_retries):
                     try:
-                        response = requests.post(url_base, auth=self.auth, json=var_data, verify=False, timeout=60)
+                        response = self.session.post(url_base, data=body, headers={'Content-Type': 'application/json'}, timeout=60)
                         response.raise_for_status()
-                        created_var = response.json()
+                        created_var = json_codec.loads(response.content)
                         created_sku = created_var.get('sku', 'NO_SKU')
                         color_log = f", цвет={variation.get('color', 'нет')}" if 'color' in variation else ""
                         return {
@@ -1143,70 +1272,83 @@ class WooCommerceService:
         try:
             # Получаем существующие вариации
             url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations"
-            response = requests.get(url, auth=self.auth, verify=False, timeout=30)
+            response = self.session.get(url, timeout=30)
             response.raise_for_status()
             
-            existing_variations = response.json()
-            updated_count = 0
+            existing_variations = json_codec.loads(response.content)
             
-            logger.info(f"  Poizon вариаций: {len(product.variations)}")
-            logger.info(f"  WooCommerce вариаций: {len(existing_variations)}")
+            logger.info("  Poizon вариаций: %s", len(product.variations))
+            logger.info("  WooCommerce вариаций: %s", len(existing_variations))
             
-            # Логируем SKU для отладки
-            if product.variations:
-                poizon_skus = [v['sku_id'] for v in product.variations[:3]]
-                # Убрано DEBUG: примеры SKU из Poizon
+            # Индекс вариаций WC по SKU: один проход вместо поиска по всему списку
+            # для каждой вариации Poizon (первая вариация с данным SKU - как и раньше)
+            wc_vars_by_sku = {}
+            for wc_var in existing_variations:
+                wc_vars_by_sku.setdefault(wc_var.get('sku'), wc_var)
             
-            if existing_variations:
-                wc_skus = [v.get('sku') for v in existing_variations[:3]]
-                # Убрано DEBUG: примеры SKU из WooCommerce
-            
-            # Обновляем по SKU
+            # Собираем изменения по SKU и отправляем одним batch запросом;
+            # вариации с прежними ценой и остатком не перезаписываем
+            updates = []
+            unchanged_count = 0
             for variation in product.variations:
                 sku_id = variation['sku_id']
                 
-                # Применяем курс и наценку к цене
-                final_price = settings.apply_price_transformation(variation['price'])
-                
                 # Ищем соответствующую вариацию в WC
-                found = False
-                for wc_var in existing_variations:
-                    if wc_var.get('sku') == sku_id:
-                        var_id = wc_var['id']
-                        
-                        # Убрано DEBUG: обновляем SKU
-                        
-                        # Обновляем цену и остаток
-                        update_url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations/{var_id}"
-                        update_data = {
-                            'regular_price': str(final_price),
-                            'stock_quantity': variation['stock']
-                        }
-                        
-                        update_response = requests.put(
-                            update_url,
-                            auth=self.auth,
-                            json=update_data,
-                            verify=False,
-                            timeout=30
-                        )
-                        update_response.raise_for_status()
-                        
-                        updated_count += 1
-                        found = True
-                        logger.info(f"  [OK] Обновлена вариация SKU={sku_id}, размер={variation.get('size', 'N/A')}")
-                        break
+                wc_var = wc_vars_by_sku.get(sku_id)
+                if wc_var is None:
+                    logger.warning("  SKU %s не найден в WooCommerce", sku_id)
+                    continue
                 
-                if not found:
-                    logger.warning(f"  SKU {sku_id} не найден в WooCommerce")
+                # Применяем курс и наценку к цене
+                final_price = str(settings.apply_price_transformation(variation['price']))
+                if _variation_unchanged(wc_var, final_price, variation['stock']):
+                    unchanged_count += 1
+                    continue
+                
+                # Обновляем цену и остаток
+                updates.append(_variation_price_update(wc_var['id'], final_price, variation['stock']))
+            
+            updated_count = unchanged_count + self.batch_update_variations(product_id, updates)
             
-            logger.info(f"[OK] Обновлено вариаций: {updated_count} из {len(product.variations)}")
+            logger.info("[OK] Обновлено вариаций: %s из %s", updated_count, len(product.variations))
             return updated_count
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка обновления вариаций товара {product_id}: {e}")
+            logger.error("[ERROR] Ошибка обновления вариаций товара %s: %s", product_id, e)
             return 0
     
+    def batch_update_variations(self, product_id: int, updates: List[Dict]) -> int:
+        """
+        Обновляет вариации товара через POST /variations/batch.
+        
+        Один запрос на WC_BATCH_SIZE вариаций вместо PUT на каждую.
+        
+        Args:
+            product_id: ID родительского товара
+            updates: Список изменений, в каждом обязательно поле 'id' вариации
+            
+        Returns:
+            Количество успешно обновленных вариаций
+        """
+        url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations/batch"
+        headers = {'Content-Type': 'application/json'}
+        updated_count = 0
+        
+        for start in range(0, len(updates), WC_BATCH_SIZE):
+            # Тело сериализуем через json_codec (orjson), а не json= (stdlib json)
+            body = json_codec.dumps({'update': updates[start:start + WC_BATCH_SIZE]})
+            response = self.session.post(url, data=body, headers=headers, timeout=60)
+            response.raise_for_status()
+            
+            # Ошибки по отдельным вариациям WooCommerce возвращает внутри ответа (статус 200)
+            for item in json_codec.loads(response.content).get('update', []):
+                if 'error' in item:
+                    logger.warning("  Вариация %s не обновлена: %s", item.get('id'), item['error'].get('message', item['error']))
+                else:
+                    updated_count += 1
+        
+        return updated_count
+    
     def update_product_prices_only(self, product_id: int, spu_id: int, currency_rate: float, markup_rubles: float, poizon_client) -> int:
         """
         Обновляет ТОЛЬКО цены и остатки товара без полной загрузки данных.
@@ -1231,25 +1373,25 @@ class WooCommerceService:
             prices = poizon_client.get_price_info(spu_id)
             
             if not prices:
-                logger.warning(f"  Нет цен для товара {spu_id}")
+                logger.warning("  Нет цен для товара %s", spu_id)
                 return 0
             
             # 2. Получаем только вариации из WooCommerce (без фото и прочего)
             variations_url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations"
             params = {'per_page': 100}
             
-            response = requests.get(
+            response = self.session.get(
                 variations_url,
-                auth=self.auth,
                 params=params,
-                verify=False,
                 timeout=30
             )
             response.raise_for_status()
-            wc_variations = response.json()
+            wc_variations = json_codec.loads(response.content)
             
-            # 3. Обновляем цены параллельно
-            updated_count = 0
+            # 3. Собираем новые цены и обновляем одним batch запросом только
+            #    изменившиеся вариации (без изменений - ни одного запроса)
+            updates = []
+            unchanged_count = 0
             
             for wc_var in wc_variations:
                 sku_id = wc_var.get('sku')
@@ -1265,31 +1407,20 @@ class WooCommerceService:
                 price_rub = poizon_price_yuan * currency_rate
                 final_price = int(price_rub + markup_rubles)
                 
-                # Обновляем вариацию
-                var_id = wc_var['id']
-                update_url = f"{self.url}/wp-json/wc/v3/products/{product_id}/variations/{var_id}"
-                update_data = {
-                    'regular_price': str(final_price),
-                    'stock_quantity': stock
-                }
-                
-                update_response = requests.put(
-                    update_url,
-                    auth=self.auth,
-                    json=update_data,
-                    verify=False,
-                    timeout=30
-                )
-                update_response.raise_for_status()
+                if _variation_unchanged(wc_var, str(final_price), stock):
+                    unchanged_count += 1
+                    continue
                 
-                updated_count += 1
-                logger.info(f"  ✓ SKU {sku_id}: {final_price}₽ (остаток: {stock})")
+                updates.append(_variation_price_update(wc_var['id'], str(final_price), stock))
+                logger.info("  SKU %s: %s₽ (остаток: %s)", sku_id, final_price, stock)
+            
+            updated_count = unchanged_count + self.batch_update_variations(product_id, updates)
             
-            logger.info(f"[OK] Обновлено {updated_count} вариаций для товара {product_id}")
+            logger.info("[OK] Обновлено %s вариаций для товара %s (без изменений: %s)", updated_count, product_id, unchanged_count)
             return updated_count
             
         except Exception as e:
-            logger.error(f"[ERROR] Ошибка обновления цен товара {product_id}: {e}")
+            logger.error("[ERROR] Ошибка обновления цен товара %s: %s", product_id, e)
             return 0
     
     def upload_resized_image(self, image_url: str, filename: str, size: int = 600) -> Optional[str]:
@@ -1313,18 +1444,14 @@ class WooCommerceService:
             upload_url = f"{self.url}/wp-json/wp/v2/media"
             
             # Транслитерация имени файла для HTTP заголовка (только ASCII символы)
-            import re
-            import unicodedata
-            
             # Убираем кириллицу и спецсимволы, оставляем только ASCII
             safe_filename = unicodedata.normalize('NFKD', filename)
             safe_filename = safe_filename.encode('ascii', 'ignore').decode('ascii')
-            safe_filename = re.sub(r'[^\w\s.-]', '', safe_filename)
-            safe_filename = re.sub(r'[-\s]+', '_', safe_filename)
+            safe_filename = _FILENAME_INVALID_RE.sub('', safe_filename)
+            safe_filename = _FILENAME_SEPARATORS_RE.sub('_', safe_filename)
             
             # Если после очистки имя пустое - генерируем из timestamp
             if not safe_filename or len(safe_filename) < 3:
-                import time
                 safe_filename = f"product_image_{int(time.time())}.jpg"
             
             headers = {
@@ -1335,17 +1462,16 @@ class WooCommerceService:
             # Используем WordPress авторизацию для загрузки изображений
             auth_to_use = self.wp_auth if self.wp_auth else self.auth
             
-            response = requests.post(
+            response = self.session.post(
                 upload_url,
                 auth=auth_to_use,
                 headers=headers,
                 data=image_bytes,
-                verify=False,
                 timeout=60  # Увеличиваем таймаут для загрузки
             )
             
             if response.status_code == 201:
-                media_data = response.json()
+                media_data = json_codec.loads(response.content)
                 media_id = media_data.get('id')
                 media_url = media_data.get('source_url')
                 logger.info(f"  ✓ Изображение загружено: {media_url} (ID: {media_id})")
@@ -1424,6 +1550,48 @@ class PoisonToWordPressService:
         
         return filtered
     
+    def _sync_one(self, idx: int, total: int, product_basic: Dict, update_existing: bool) -> str:
+        """
+        Синхронизирует один товар (выполняется в потоке sync_all_products).
+        
+        Returns:
+            Итог: 'created', 'updated', 'skipped' или 'error'
+        """
+        spu_id = product_basic.get('spuId')
+        
+        if not spu_id:
+            logger.warning("Товар %s: нет spuId, пропускаем", idx)
+            return 'skipped'
+        
+        try:
+            logger.info("\n[%s/%s] Обработка товара spuId %s", idx, total, spu_id)
+            
+            # Получаем полную информацию о товаре
+            product = self.poizon.get_product_full_info(spu_id)
+            
+            if not product:
+                logger.warning("  Не удалось загрузить товар %s", spu_id)
+                return 'error'
+            
+            # Проверяем существует ли товар
+            existing_id = self.woocommerce.product_exists(product.sku)
+            
+            if existing_id:
+                if update_existing:
+                    logger.info("  Товар существует (ID %s), обновляем...", existing_id)
+                    self.woocommerce.update_product_variations(existing_id, product, self.settings)
+                    return 'updated'
+                logger.info("  Товар существует (ID %s), пропускаем", existing_id)
+                return 'skipped'
+            
+            logger.info("  Создаем новый товар...")
+            new_id = self.woocommerce.create_product(product, self.settings)
+            return 'created' if new_id else 'error'
+            
+        except Exception as e:
+            logger.error("  [ERROR] Ошибка обработки товара %s: %s", spu_id, e)
+            return 'error'
+    
     def sync_all_products(self, limit: int = 100, update_existing: bool = True):
         """
         Синхронизирует все товары из Poizon в WordPress.
@@ -1446,56 +1614,21 @@ class PoisonToWordPressService:
         # Применяем фильтры
         products_list = self.filter_products(products_list)
         
-        created_count = 0
-        updated_count = 0
-        skipped_count = 0
-        error_count = 0
+        counts = {'created': 0, 'updated': 0, 'skipped': 0, 'error': 0}
+        total = len(products_list)
         
-        for idx, product_basic in enumerate(products_list, 1):
-            spu_id = product_basic.get('spuId')
-            
-            if not spu_id:
-                logger.warning(f"Товар {idx}: нет spuId, пропускаем")
-                skipped_count += 1
-                continue
-            
-            try:
-                logger.info(f"\n[{idx}/{len(products_list)}] Обработка товара spuId {spu_id}")
-                
-                # Получаем полную информацию о товаре
-                product = self.poizon.get_product_full_info(spu_id)
-                
-                if not product:
-                    logger.warning(f"  Не удалось загрузить товар {spu_id}")
-                    error_count += 1
-                    continue
-                
-                # Проверяем существует ли товар
-                existing_id = self.woocommerce.product_exists(product.sku)
-                
-                if existing_id:
-                    if update_existing:
-                        logger.info(f"  Товар существует (ID {existing_id}), обновляем...")
-                        self.woocommerce.update_product_variations(existing_id, product, self.settings)
-                        updated_count += 1
-                    else:
-                        logger.info(f"  Товар существует (ID {existing_id}), пропускаем")
-                        skipped_count += 1
-                else:
-                    logger.info(f"  Создаем новый товар...")
-                    new_id = self.woocommerce.create_product(product, self.settings)
-                    
-                    if new_id:
-                        created_count += 1
-                    else:
-                        error_count += 1
-                
-                # Пауза для соблюдения rate limits (уменьшена для ускорения)
-                time.sleep(0.5)  # Было 2 секунды, стало 0.5
-                
-            except Exception as e:
-                logger.error(f"  [ERROR] Ошибка обработки товара {spu_id}: {e}")
-                error_count += 1
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+            futures = [
+                executor.submit(self._sync_one, idx, total, product_basic, update_existing)
+                for idx, product_basic in enumerate(products_list, 1)
+            ]
+            for future in as_completed(futures):
+                counts[future.result()] += 1
+        
+        created_count = counts['created']
+        updated_count = counts['updated']
+        skipped_count = counts['skipped']
+        error_count = counts['error']
         
         # Итоги
         logger.info("\n" + "="*70)
@@ -1648,5 +1781,13 @@ def main():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('poizon_sync_service.log', encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
     main()
 
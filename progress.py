@@ -0,0 +1,85 @@
+"""
+Progress events for long-running jobs, shared between processes through Redis.
+
+Producers (Celery tasks) append JSON events to a Redis Stream per session and
+the SSE endpoint in web_app reads them with a blocking XREAD. Unlike an
+in-process queue this works when the producer and the SSE reader live in
+different gunicorn/Celery workers. Events pushed before the browser connects
+are kept until it does. A session is read by one SSE connection from its
+first event; when that connection ends the session is closed and its stream
+deleted, which also tells the producers to stop (there is no reconnect/resume).
+"""
+import os
+from typing import List, Tuple
+
+import json_codec
+import redis_store
+
+# Events kept per session (approximately: the stream is trimmed with MAXLEN ~);
+# a slow client loses the oldest ones, never the final ones
+PROGRESS_QUEUE_MAXSIZE = int(os.getenv('PROGRESS_QUEUE_MAXSIZE', 500))
+
+# Stream id to read a session from its first event
+FIRST_ID = '0-0'
+
+# Abandoned sessions expire on their own
+PROGRESS_TTL = 60 * 60
+
+# Last event of a session
+DONE = 'DONE'
+DONE_RAW = json_codec.dumps(DONE)
+
+def _events_key(session_id: str) -> str:
+    return f'progress:{session_id}'
+
+
+def _active_key(session_id: str) -> str:
+    return f'progress:{session_id}:active'
+
+
+def _started_key(session_id: str) -> str:
+    return f'progress:{session_id}:started'
+
+
+def open_session(session_id: str):
+    """Registers a session; it stays active until close_session() or PROGRESS_TTL."""
+    redis_store.client().set(_active_key(session_id), 1, ex=PROGRESS_TTL)
+
+
+def is_active(session_id: str) -> bool:
+    """False once the SSE client is gone, so producers can stop early."""
+    return bool(redis_store.client().exists(_active_key(session_id)))
+
+
+def close_session(session_id: str):
+    redis_store.client().delete(_active_key(session_id), _events_key(session_id), _started_key(session_id))
+
+
+def push(session_id: str, event):
+    """Appends an event (a dict or DONE) to the session's stream."""
+    key = _events_key(session_id)
+    pipe = redis_store.client().pipeline(transaction=False)
+    pipe.xadd(key, {'data': json_codec.dumps(event)}, maxlen=PROGRESS_QUEUE_MAXSIZE, approximate=True)
+    pipe.expire(key, PROGRESS_TTL)
+    pipe.execute()
+
+
+def read_raw(session_id: str, last_id: str, timeout: int) -> List[Tuple[bytes, bytes]]:
+    """
+    Events after last_id as (entry id, serialized JSON) pairs.
+
+    Blocks up to timeout seconds; an empty list means nothing arrived.
+    """
+    reply = redis_store.client().xread({_events_key(session_id): last_id}, block=timeout * 1000)
+    if not reply:
+        return []
+    return [(entry_id, fields[b'data']) for entry_id, fields in reply[0][1]]
+
+
+def next_started(session_id: str) -> int:
+    """Running number of started items, monotonic across workers (for the progress bar)."""
+    key = _started_key(session_id)
+    pipe = redis_store.client().pipeline(transaction=False)
+    pipe.incr(key)
+    pipe.expire(key, PROGRESS_TTL)
+    return pipe.execute()[0]
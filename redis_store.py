@@ -0,0 +1,46 @@
+"""
+Redis connections and key namespaces shared by the web app, Celery tasks and services.
+
+REDIS_URL is read here only, after .env is loaded, so every module talks to the
+same server and database. Clients are created lazily, one per process and
+response mode (bytes or decoded str); redis-py clients are thread-safe and
+each keeps its own connection pool. The pool is unbounded by default: every
+open SSE stream holds a connection in a blocking XREAD. REDIS_MAX_CONNECTIONS
+caps it (a request over the cap fails instead of waiting).
+
+Keys are grouped by prefix:
+    CACHE_PREFIX          disposable API response cache (web_app.RedisCache), the
+                          only keys /api/cache/clear removes
+    CACHE_GENERATION_KEY  counter bumped by /api/cache/clear (kept outside
+                          CACHE_PREFIX); per-process caches drop their entries when it changes
+    progress:*            progress streams of running jobs (progress.py)
+    poizon:sku2spu        SKU -> spuId index (spu_index.py)
+    poizon:full:*         full Poizon product info (services.cached_full_info)
+    gigachat:*            generated SEO texts and color translations (services.py)
+Celery's broker and result keys live in the same database.
+"""
+import os
+from typing import Dict
+
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', 0)) or None
+
+CACHE_PREFIX = 'cache:'
+CACHE_GENERATION_KEY = 'cache_generation'
+
+_clients: Dict[bool, redis.Redis] = {}
+
+
+def client(decode_responses: bool = False) -> redis.Redis:
+    """The process-wide client; replies are bytes unless decode_responses is set."""
+    redis_client = _clients.get(decode_responses)
+    if redis_client is None:
+        redis_client = _clients[decode_responses] = redis.from_url(
+            REDIS_URL, decode_responses=decode_responses, max_connections=REDIS_MAX_CONNECTIONS
+        )
+    return redis_client
@@ -2,19 +2,151 @@
 This module initializes shared services to prevent circular imports.
 """
 import os
+import re
+import functools
+import hashlib
+import ssl
+import threading
+import time
 import logging
 import requests
+import urllib3
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import json_codec
+import redis_store
 
 from poizon_to_wordpress_service import WooCommerceService
 from poizon_api_fixed import PoisonAPIClientFixed as PoisonAPIService
 
 logger = logging.getLogger(__name__)
 
+# GigaChat uses the Russian national CA, so certificate verification is off;
+# silence the per-request warning once instead of on every call.
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Strips list numbering like "1. ", "2) " or "10: " from GigaChat response lines
+_LINE_NUM_RE = re.compile(r'^\d{1,2}[.):]\s*')
+
+# Quotes and punctuation GigaChat sometimes wraps a one-word answer in ("Красный".)
+_COLOR_STRIP_CHARS = '"\'«».,;!? \n\r\t'
+
+# Chinese characters (CJK Unified Ideographs, Extension A and compatibility
+# ideographs): colors without them need no translation
+_CJK_RE = re.compile('[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+# Fixed SEO instructions, sent as the system message so the per-product
+# user message only carries the product data.
+_SEO_SYSTEM_PROMPT = """Generate SEO content for a product.
+Translate Chinese to English in the title. Create a Russian SEO Title, short description, and a full description (at least 800 characters).
+Respond in the following format, with each field on a new line:
+1. Russian Title
+2. SEO Title
+3. Short Description
+4. Full Description
+5. Meta Description
+6. Keywords (semicolon-separated)"""
+
+# Batch variant: several products per request, answered as a JSON array.
+_SEO_BATCH_SYSTEM_PROMPT = """Generate SEO content for each of the products below.
+Translate Chinese to English in the title. Create a Russian SEO Title, short description, and a full description (at least 800 characters).
+Respond with a JSON array only, one object per product in the same order, each with the fields:
+"title_ru", "seo_title", "short_description", "full_description", "meta_description", "keywords" (semicolon-separated)."""
+
+_SEO_FIELDS = ("title_ru", "seo_title", "short_description", "full_description", "meta_description", "keywords")
+
+# Products per GigaChat request in translate_and_generate_seo_batch
+SEO_BATCH_SIZE = int(os.getenv('GIGACHAT_SEO_BATCH_SIZE', '5'))
+
+# The access token is refreshed this many seconds before it expires
+TOKEN_REFRESH_MARGIN = 60
+
+# Parallel GigaChat requests in translate_and_generate_seo_batch
+SEO_MAX_CONCURRENCY = int(os.getenv('GIGACHAT_MAX_CONCURRENCY', '8'))
+
+# SeoBatchQueue: a batch is sent once it has this many characters of product
+# text, or FLUSH_MS after its first product, whichever comes first
+SEO_BATCH_MAX_CHARS = int(os.getenv('GIGACHAT_SEO_BATCH_MAX_CHARS', '12000'))
+SEO_BATCH_FLUSH_MS = int(os.getenv('GIGACHAT_SEO_BATCH_FLUSH_MS', '200'))
+
+# SEO responses are streamed (SSE): the body is read and its deltas joined as
+# the tokens arrive instead of waiting for the whole response at once
+SEO_STREAM = os.getenv('GIGACHAT_STREAM', 'true').lower() == 'true'
+
+# Color translations remembered per process
+COLOR_CACHE_SIZE = int(os.getenv('GIGACHAT_COLOR_CACHE_SIZE', '4096'))
+
 # Global service clients, initialized once
 poizon_client = None
 woocommerce_client = None
 gigachat_client = None
+seo_queue = None
+
+# Connection pool shared by the Poizon and WooCommerce clients. Each client keeps
+# its own Session (auth, headers, verify), only the keep-alive pool is common.
+HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '10'))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '50'))
+http_adapter = None
+
+# GigaChat has its own pool (separate SSL context); sized for concurrent product tasks
+GIGACHAT_POOL_CONNECTIONS = int(os.getenv('GIGACHAT_POOL_CONNECTIONS', '4'))
+GIGACHAT_POOL_MAXSIZE = int(os.getenv('GIGACHAT_POOL_MAXSIZE', '16'))
+
+# Full Poizon product info is reused for a while (re-runs of a failed sync,
+# several WooCommerce SKUs of one SPU). Prices are applied later, so the
+# cached data does not depend on the sync settings.
+FULL_INFO_CACHE_TTL = int(os.getenv('POIZON_FULL_INFO_CACHE_TTL', '600'))
+
+# Generated SEO texts and color translations are kept in Redis, so re-imports
+# of the same products do not call GigaChat again. Fallback results are not cached.
+SEO_CACHE_TTL = int(os.getenv('GIGACHAT_SEO_CACHE_TTL', 30 * 24 * 60 * 60))
+COLOR_CACHE_KEY = 'gigachat:colors'
+
+class _SSLContextAdapter(HTTPAdapter):
+    """HTTPAdapter that shares one SSLContext across all pooled connections (enables TLS session reuse)."""
+
+    def __init__(self, ssl_context, **kwargs):
+        self._ssl_context = ssl_context
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = self._ssl_context
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs['ssl_context'] = self._ssl_context
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+def _build_gigachat_session() -> requests.Session:
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+
+    # Transient errors (rate limit, gateway restarts) are retried with backoff.
+    # POST is included: a repeated completion only costs tokens. The final
+    # response is returned as-is, so 401 handling and raise_for_status still apply.
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False,
+    )
+
+    session = requests.Session()
+    session.verify = False
+    session.mount('https://', _SSLContextAdapter(
+        ctx, pool_connections=GIGACHAT_POOL_CONNECTIONS, pool_maxsize=GIGACHAT_POOL_MAXSIZE, max_retries=retry
+    ))
+    return session
+
 
 class GigaChatService:
     """Client for GigaChat API."""
@@ -24,13 +156,19 @@ class GigaChatService:
         self.client_id = os.getenv('GIGACHAT_CLIENT_ID')
         self.base_url = 'https://gigachat.devices.sberbank.ru/api/v1'
         self.access_token = None
+        self.token_expires_at = 0.0
+        self._token_lock = threading.Lock()
+        self.session = _build_gigachat_session()
+        # The same colors repeat across thousands of products; failures raise and are not cached
+        self._translate_color_cached = functools.lru_cache(maxsize=COLOR_CACHE_SIZE)(self._translate_color_uncached)
         
         if not self.auth_key or not self.client_id:
             logger.warning("GIGACHAT_AUTH_KEY or GIGACHAT_CLIENT_ID not found in .env. GigaChat is disabled.")
             self.enabled = False
         else:
+            # The token is requested on first use (_ensure_token), not here: starting
+            # a worker does not wait for the OAuth round-trip or fail if it is down
             self.enabled = True
-            self._get_access_token()
 
     def _get_access_token(self):
         if not self.enabled:
@@ -54,28 +192,62 @@ class GigaChatService:
             if self.client_id:
                  headers["X-Client-ID"] = str(self.client_id)
 
-            response = requests.post(url, headers=headers, data=data, verify=False, timeout=30)
+            response = self.session.post(url, headers=headers, data=data, verify=False, timeout=30)
             response.raise_for_status()
-            self.access_token = response.json()["access_token"]
+            token_data = json_codec.loads(response.content)
+            self.access_token = token_data["access_token"]
+            # expires_at is in milliseconds since the epoch; tokens live about 30 minutes
+            expires_at = token_data.get("expires_at")
+            self.token_expires_at = expires_at / 1000 if expires_at else time.time() + 30 * 60
         except Exception as e:
             logger.error(f"Error getting GigaChat token: {e}")
             if hasattr(e, 'response') and e.response:
                 logger.error(f"Server response: {e.response.text}")
             self.enabled = False
 
+    def _ensure_token(self):
+        """Refreshes the token shortly before it expires, so requests do not run into a 401."""
+        if time.time() < self.token_expires_at - TOKEN_REFRESH_MARGIN:
+            return
+        with self._token_lock:
+            if time.time() >= self.token_expires_at - TOKEN_REFRESH_MARGIN:
+                self._get_access_token()
+
+    def _refresh_access_token(self, expired_token: str):
+        """
+        Refreshes the token after a 401. Concurrent requests that hit the same
+        expired token wait for one refresh instead of each requesting a new token.
+        """
+        with self._token_lock:
+            if self.access_token == expired_token:
+                logger.warning("GigaChat access token expired, refreshing...")
+                self._get_access_token()
+
     def translate_color(self, color_chinese: str) -> str:
-        if not self.enabled or not color_chinese or not any('\u4e00' <= char <= '\u9fff' for char in color_chinese):
+        if not self.enabled or not color_chinese or _CJK_RE.search(color_chinese) is None:
             return color_chinese
         
         try:
-            # Simplified prompt for color translation
-            prompt = f"Translate the following color from Chinese to Russian. Respond with only the translated color name. Chinese: '{color_chinese}'"
-            
-            return self._make_chat_completion(prompt, temperature=0.2, max_tokens=50)
+            return self._translate_color_cached(color_chinese)
         except Exception as e:
             logger.warning(f"Error translating color '{color_chinese}': {e}, using original.")
             return color_chinese
 
+    def _translate_color_uncached(self, color_chinese: str) -> str:
+        translation = _color_cache_get(color_chinese)
+        if translation:
+            return translation
+
+        # Simplified prompt for color translation
+        prompt = f"Translate the following color from Chinese to Russian. Respond with only the translated color name. Chinese: '{color_chinese}'"
+        
+        translation = self._make_chat_completion(prompt, temperature=0.2, max_tokens=50).strip(_COLOR_STRIP_CHARS)
+        if not translation:
+            # Raised, not returned, so that lru_cache does not remember the failure
+            raise ValueError("empty response")
+        _color_cache_set(color_chinese, translation)
+        return translation
+
     def translate_and_generate_seo(self, title: str, description: str, category: str, brand: str, attributes: dict = None, article_number: str = '') -> dict:
         if not self.enabled:
             logger.warning("GigaChat is not configured, using basic processing.")
@@ -84,38 +256,137 @@ class GigaChatService:
         try:
             # Using a more structured and robust prompt
             prompt = self._build_seo_prompt(title, description, category, brand, attributes, article_number)
+            cache_key = _seo_cache_key(prompt)
+            cached = _seo_cache_get_many([cache_key])[0]
+            if cached is not None:
+                return cached
             
-            response_text = self._make_chat_completion(prompt, temperature=0.7, max_tokens=1500)
+            response_text = self._make_chat_completion(
+                prompt, temperature=0.7, max_tokens=1500, system=_SEO_SYSTEM_PROMPT, stream=SEO_STREAM
+            )
             
-            return self._parse_seo_response(response_text, title, brand, category, description)
+            seo = self._parse_seo_response(response_text)
+            if seo is None:
+                logger.warning("GigaChat returned an incomplete response. Using fallback.")
+                return self._get_basic_seo(title, brand, category, description)
+            _seo_cache_set_many({cache_key: seo})
+            return seo
             
         except Exception as e:
             logger.error(f"Error in GigaChat SEO generation: {e}")
             return self._get_basic_seo(title, brand, category, description)
 
-    def _make_chat_completion(self, content: str, temperature: float, max_tokens: int) -> str:
+    def translate_and_generate_seo_batch(self, products: list) -> list:
+        """
+        Generates SEO content for several products with one request per SEO_BATCH_SIZE products.
+
+        Each item of `products` is a dict with the keyword arguments of
+        translate_and_generate_seo. Up to SEO_MAX_CONCURRENCY requests run at
+        once. Results are returned in the same order; if a chunk cannot be
+        parsed, its products fall back to one request each. Products already
+        in the SEO cache are not sent at all.
+        """
+        if not self.enabled:
+            return [self.translate_and_generate_seo(**p) for p in products]
+
+        prompts = [
+            self._build_seo_prompt(
+                p.get('title', ''), p.get('description', ''), p.get('category', ''),
+                p.get('brand', ''), p.get('attributes'), p.get('article_number', '')
+            )
+            for p in products
+        ]
+        cache_keys = [_seo_cache_key(prompt) for prompt in prompts]
+        results = _seo_cache_get_many(cache_keys)
+        missing = [(p, prompt, key) for p, prompt, key, result in zip(products, prompts, cache_keys, results)
+                   if result is None]
+
+        chunks = [missing[start:start + SEO_BATCH_SIZE] for start in range(0, len(missing), SEO_BATCH_SIZE)]
+        if len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=min(SEO_MAX_CONCURRENCY, len(chunks))) as executor:
+                chunk_results = list(executor.map(self._generate_seo_chunk, chunks))
+        else:
+            chunk_results = [self._generate_seo_chunk(chunk) for chunk in chunks]
+
+        generated = iter(result for chunk_result in chunk_results for result in chunk_result)
+        return [result if result is not None else next(generated) for result in results]
+
+    def _generate_seo_chunk(self, chunk: list) -> list:
+        # chunk: [(product kwargs, product prompt, cache key)]
+        parsed = None
+        if len(chunk) > 1:
+            try:
+                prompt = "\n\n".join(
+                    f"Product {i}:\n{product_prompt}" for i, (_, product_prompt, _) in enumerate(chunk, 1)
+                )
+                response_text = self._make_chat_completion(
+                    prompt, temperature=0.7, max_tokens=1500 * len(chunk), system=_SEO_BATCH_SYSTEM_PROMPT,
+                    stream=SEO_STREAM
+                )
+                parsed = self._parse_seo_batch_response(response_text, len(chunk))
+            except Exception as e:
+                logger.error(f"Error in GigaChat batch SEO generation: {e}")
+
+        if parsed is None:
+            return [self.translate_and_generate_seo(**p) for p, _, _ in chunk]
+        _seo_cache_set_many({key: seo for (_, _, key), seo in zip(chunk, parsed)})
+        return parsed
+
+    def _make_chat_completion(self, content: str, temperature: float, max_tokens: int, system: str = None,
+                              stream: bool = False) -> str:
         url = f"{self.base_url}/chat/completions"
+        self._ensure_token()
+        if not self.enabled:
+            # _get_access_token failed and switched GigaChat off; callers fall back
+            raise RuntimeError("GigaChat access token is unavailable")
+        token = self.access_token
         headers = {
-            "Authorization": f"Bearer {self.access_token}",
+            "Authorization": f"Bearer {token}",
             "Content-Type": "application/json"
         }
+        messages = [{"role": "user", "content": content}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
         payload = {
             "model": "GigaChat",
-            "messages": [{"role": "user", "content": content}],
+            "messages": messages,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
+        if stream:
+            payload["stream"] = True
         
-        response = requests.post(url, headers=headers, json=payload, verify=False, timeout=120)
+        # json_codec (orjson when installed): the SEO payloads are large and mostly Cyrillic
+        body = json_codec.dumps(payload)
+        response = self.session.post(url, headers=headers, data=body, verify=False, timeout=120, stream=stream)
         
         if response.status_code == 401:
-            logger.warning("GigaChat access token expired, refreshing...")
-            self._get_access_token()
+            response.close()
+            self._refresh_access_token(token)
             headers["Authorization"] = f"Bearer {self.access_token}"
-            response = requests.post(url, headers=headers, json=payload, verify=False, timeout=120)
+            response = self.session.post(url, headers=headers, data=body, verify=False, timeout=120, stream=stream)
             
-        response.raise_for_status()
-        return response.json()['choices'][0]['message']['content'].strip()
+        with response:
+            response.raise_for_status()
+            if stream:
+                return self._read_stream(response).strip()
+            return json_codec.loads(response.content)['choices'][0]['message']['content'].strip()
+
+    @staticmethod
+    def _read_stream(response) -> str:
+        """Joins the content deltas of a streamed (SSE) chat completion."""
+        parts = []
+        for line in response.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            data = line[5:].strip()
+            if data == b'[DONE]':
+                break
+            for choice in json_codec.loads(data).get('choices', ()):
+                delta = choice.get('delta', {}).get('content')
+                if delta:
+                    parts.append(delta)
+        return ''.join(parts)
 
     def _get_basic_seo(self, title, brand, category, description):
         return {
@@ -127,34 +398,26 @@ class GigaChatService:
         }
 
     def _build_seo_prompt(self, title, description, category, brand, attributes, article_number):
-        # This prompt can be refined over time.
-        # Keeping it simple to avoid complex parsing logic.
-        return f"""
-        Generate SEO content for a product.
-        - Brand: {brand}
-        - Original Title: {title}
-        - Category: {category}
-        - Article: {article_number}
-        - Attributes: {attributes}
-
-        Translate Chinese to English in the title. Create a Russian SEO Title, short description, and a full description (at least 800 characters).
-        Respond in the following format, with each field on a new line:
-        1. Russian Title
-        2. SEO Title
-        3. Short Description
-        4. Full Description
-        5. Meta Description
-        6. Keywords (semicolon-separated)
-        """
+        # Only the product-specific data; the fixed instructions live in _SEO_SYSTEM_PROMPT.
+        # Empty fields are left out and attributes are sent as "name: value" pairs
+        # rather than a dict repr, so the per-product message stays short.
+        lines = [f"Brand: {brand}", f"Title: {title}", f"Category: {category}"]
+        if article_number:
+            lines.append(f"Article: {article_number}")
+        if attributes:
+            lines.append("Attributes: " + "; ".join(f"{name}: {value}" for name, value in attributes.items()))
+        return "\n".join(lines)
 
-    def _parse_seo_response(self, response_text, fallback_title, brand, category, description):
-        lines = response_text.split('\n')
-        # Clean up lines from numbering like "1. "
-        cleaned_lines = [re.sub(r'^\d+\.\s*', '', line).strip() for line in lines if line.strip()]
+    def _parse_seo_response(self, response_text):
+        # None if the response does not have all six fields
+        cleaned_lines = []
+        for line in response_text.split('\n'):
+            line = _LINE_NUM_RE.sub('', line.strip())
+            if line:
+                cleaned_lines.append(line)
 
         if len(cleaned_lines) < 6:
-            logger.warning("GigaChat returned an incomplete response. Using fallback.")
-            return self._get_basic_seo(fallback_title, brand, category, description)
+            return None
 
         return {
             "title_ru": cleaned_lines[0],
@@ -166,21 +429,178 @@ class GigaChatService:
         }
 
 
+    def _parse_seo_batch_response(self, response_text, expected):
+        # The model sometimes wraps JSON in a code fence; take the outermost array.
+        start, end = response_text.find('['), response_text.rfind(']')
+        if start == -1 or end <= start:
+            logger.warning("GigaChat batch response contains no JSON array. Using fallback.")
+            return None
+        items = json_codec.loads(response_text[start:end + 1])
+        if (not isinstance(items, list) or len(items) != expected
+                or not all(isinstance(item, dict) and all(item.get(f) for f in _SEO_FIELDS[:5]) for item in items)):
+            logger.warning("GigaChat returned an incomplete batch response. Using fallback.")
+            return None
+        return [{f: str(item.get(f, '')).strip() for f in _SEO_FIELDS} for item in items]
+
+class SeoBatchQueue:
+    """
+    Groups concurrent translate_and_generate_seo calls into batch requests.
+
+    Product tasks running side by side in one worker (gevent pool) call
+    generate() independently; their products are collected and sent through
+    translate_and_generate_seo_batch in one GigaChat request per batch.
+    A batch is flushed when it reaches max_items products or max_chars
+    characters of product text, or flush_ms after its first product.
+    """
+
+    def __init__(self, service: GigaChatService, max_items: int = SEO_BATCH_SIZE,
+                 max_chars: int = SEO_BATCH_MAX_CHARS, flush_ms: int = SEO_BATCH_FLUSH_MS):
+        self.service = service
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.flush_ms = flush_ms
+        self._lock = threading.Lock()
+        self._pending = []  # [(product kwargs, Future)]
+        self._chars = 0
+        self._timer = None
+
+    def generate(self, **product) -> dict:
+        """Same arguments and result as GigaChatService.translate_and_generate_seo."""
+        return self.submit(**product).result()
+
+    def submit(self, **product) -> Future:
+        future = Future()
+        batch = None
+        with self._lock:
+            self._pending.append((product, future))
+            self._chars += len(product.get('title') or '') + len(product.get('description') or '')
+            if len(self._pending) >= self.max_items or self._chars >= self.max_chars:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_ms / 1000, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if batch:
+            self._run(batch)
+        return future
+
+    def _take(self) -> list:
+        # Called with the lock held
+        batch, self._pending, self._chars = self._pending, [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run(batch)
+
+    def _run(self, batch: list):
+        try:
+            results = self.service.translate_and_generate_seo_batch([product for product, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
 def init_services():
     """Initializes all shared services and clients."""
-    global poizon_client, woocommerce_client, gigachat_client
+    global poizon_client, woocommerce_client, gigachat_client, seo_queue, http_adapter
     
     # This function will be called once per process (Gunicorn worker, Celery worker)
+    if http_adapter is None:
+        http_adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE)
+    
     if poizon_client is None:
         logger.info("Initializing PoizonAPIService...")
-        poizon_client = PoisonAPIService()
+        poizon_client = PoisonAPIService(adapter=http_adapter)
     
     if woocommerce_client is None:
         logger.info("Initializing WooCommerceService...")
-        woocommerce_client = WooCommerceService()
+        woocommerce_client = WooCommerceService(adapter=http_adapter)
         
     if gigachat_client is None:
         logger.info("Initializing GigaChatService...")
         gigachat_client = GigaChatService()
+
+    if seo_queue is None:
+        seo_queue = SeoBatchQueue(gigachat_client)
     
     logger.info("All services initialized.")
+
+
+def cached_full_info(spu_id: int) -> Optional[SimpleNamespace]:
+    """
+    poizon_client.get_product_full_info() behind a Redis cache shared by all workers.
+
+    Every call returns a fresh object, so callers may modify it. Failed
+    lookups are not cached; if Redis is unavailable the API is called directly.
+    """
+    key = f"poizon:full:{spu_id}"
+    try:
+        cached = redis_store.client().get(key)
+        if cached:
+            return SimpleNamespace(**json_codec.loads(cached))
+    except Exception as e:
+        logger.warning(f"Full info cache read failed for {spu_id}: {e}")
+
+    product = poizon_client.get_product_full_info(spu_id)
+    if product:
+        try:
+            redis_store.client().set(key, json_codec.dumps(vars(product)), ex=FULL_INFO_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"Full info cache write failed for {spu_id}: {e}")
+    return product
+
+
+def _seo_cache_key(product_prompt: str) -> str:
+    # The key covers exactly what GigaChat sees, instructions included, so
+    # changing the prompt starts a fresh cache.
+    digest = hashlib.blake2b(f"{_SEO_SYSTEM_PROMPT}\n{product_prompt}".encode('utf-8'), digest_size=16)
+    return f"gigachat:seo:{digest.hexdigest()}"
+
+
+def _seo_cache_get_many(keys: list) -> list:
+    """Cached SEO dicts for the keys (None for misses); all misses if Redis is unavailable."""
+    if not keys:
+        return []
+    try:
+        return [json_codec.loads(value) if value else None for value in redis_store.client().mget(keys)]
+    except Exception as e:
+        logger.warning(f"SEO cache read failed: {e}")
+        return [None] * len(keys)
+
+
+def _seo_cache_set_many(items: dict):
+    try:
+        pipe = redis_store.client().pipeline(transaction=False)
+        for key, seo in items.items():
+            pipe.set(key, json_codec.dumps(seo), ex=SEO_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"SEO cache write failed: {e}")
+
+
+def _color_cache_get(color_chinese: str) -> Optional[str]:
+    try:
+        translation = redis_store.client().hget(COLOR_CACHE_KEY, color_chinese)
+        return translation.decode('utf-8') if translation else None
+    except Exception as e:
+        logger.warning(f"Color cache read failed for '{color_chinese}': {e}")
+        return None
+
+
+def _color_cache_set(color_chinese: str, translation: str):
+    try:
+        pipe = redis_store.client().pipeline(transaction=False)
+        pipe.hset(COLOR_CACHE_KEY, color_chinese, translation)
+        pipe.expire(COLOR_CACHE_KEY, SEO_CACHE_TTL)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Color cache write failed for '{color_chinese}': {e}")
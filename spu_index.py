@@ -0,0 +1,59 @@
+"""
+SKU -> Poizon spuId index, shared between processes through Redis.
+
+A product without the _poizon_spu_id meta has to be found in Poizon by SKU,
+which costs a search request plus a WooCommerce write. The index keeps every
+resolved pair in one Redis hash, so the search is done once per SKU for all
+gunicorn/Celery workers and survives restarts. It is filled by the price
+update fallback and by the periodic refresh_spu_index_task.
+
+The hash is long-lived state, not cache: it is outside redis_store.CACHE_PREFIX,
+so /api/cache/clear keeps it. If it is lost anyway (Redis restarted without
+persistence, eviction, a manual flush), the next price update rebuilds it.
+"""
+import os
+from typing import Dict, List, Optional
+
+import redis_store
+
+INDEX_KEY = 'poizon:sku2spu'
+REBUILD_LOCK_KEY = 'poizon:sku2spu:rebuild'
+
+# How long a started rebuild keeps others from starting (it reads every WooCommerce product)
+REBUILD_LOCK_TTL = 30 * 60
+
+# Refreshed on every write, so the hash only expires if nothing uses it
+INDEX_TTL = int(os.getenv('SPU_INDEX_TTL', 30 * 24 * 60 * 60))
+
+def get(sku: str) -> Optional[int]:
+    """The indexed spuId for a SKU, or None."""
+    spu_id = redis_store.client(decode_responses=True).hget(INDEX_KEY, sku)
+    return int(spu_id) if spu_id else None
+
+
+def get_many(skus: List[str]) -> Dict[str, Optional[int]]:
+    """Indexed spuIds for several SKUs in one round-trip (None for unknown SKUs)."""
+    if not skus:
+        return {}
+    values = redis_store.client(decode_responses=True).hmget(INDEX_KEY, skus)
+    return {sku: int(spu_id) if spu_id else None for sku, spu_id in zip(skus, values)}
+
+
+def set_many(mapping: Dict[str, int]):
+    """Adds SKU -> spuId pairs to the index."""
+    if not mapping:
+        return
+    pipe = redis_store.client(decode_responses=True).pipeline(transaction=False)
+    pipe.hset(INDEX_KEY, mapping={sku: str(spu_id) for sku, spu_id in mapping.items()})
+    pipe.expire(INDEX_KEY, INDEX_TTL)
+    pipe.execute()
+
+
+def exists() -> bool:
+    """False if the index is missing altogether (as opposed to not knowing a SKU)."""
+    return bool(redis_store.client(decode_responses=True).exists(INDEX_KEY))
+
+
+def claim_rebuild() -> bool:
+    """True for the one caller that should start a rebuild; others get False until the lock expires."""
+    return bool(redis_store.client(decode_responses=True).set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_TTL))
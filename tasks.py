@@ -2,33 +2,60 @@
 Celery tasks for the Poizon-WordPress integration.
 
 This module contains the background tasks that are executed by Celery workers,
-such as processing and uploading products.
+such as processing and uploading products and updating prices of existing ones.
 """
 import os
 import logging
-from dataclasses import dataclass, asdict
-from datetime import datetime
+from dataclasses import dataclass
 import re
+import time
+
+import json_codec
 
 # Import services and settings
-from poizon_to_wordpress_service import WooCommerceService, SyncSettings
-from poizon_api_fixed import PoisonAPIClientFixed as PoisonAPIService
-from services import GigaChatService, init_services, poizon_client, woocommerce_client, gigachat_client
+from poizon_to_wordpress_service import SyncSettings
+import services
+from services import init_services
+import progress
+import spu_index
 
 # Import the Celery app instance
+from celery import chord
 from celery_app import celery
 
 # Get the logger
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Latin letters, digits and basic punctuation kept by _extract_latin_only
+_LATIN_CHUNK_RE = re.compile(r"[a-zA-Z0-9\s\-\./]+")
+
+
+# Fixed progress messages, shared by every status update
+MSG_LOADING_POIZON = 'Загрузка данных из Poizon API...'
+MSG_GIGACHAT = 'Обработка через GigaChat...'
+MSG_CHECKING_WORDPRESS = 'Проверка товара в WordPress...'
+MSG_CREATING_PRODUCT = 'Создание нового товара...'
+
+# Price update progress lines (status_update events)
+MSG_LOADING_WORDPRESS = '  → Загрузка товара из WordPress...'
+MSG_SEARCHING_SKU = '  → Поиск в Poizon по SKU {}...'
+MSG_UPDATING_PRICES = '  → Обновление цен и остатков из Poizon (SPU: {})...'
+
+
+@dataclass(frozen=True)
 class ProcessingStatus:
     """A serializable status for product processing."""
+    __slots__ = ('product_id', 'status', 'progress', 'message', 'timestamp')
+
     product_id: str
     status: str  # e.g., 'PROGRESS', 'SUCCESS', 'FAILURE'
     progress: int
     message: str
-    timestamp: str
+    timestamp: float  # Unix time; formatted only where it is displayed
+
+    def to_dict(self) -> dict:
+        """Flat field copy for Celery meta; cheaper than dataclasses.asdict's deep copy."""
+        return {name: getattr(self, name) for name in self.__slots__}
 
 class ProductProcessor:
     """
@@ -45,10 +72,10 @@ class ProductProcessor:
         """
         self.celery_task = celery_task
         self.settings = settings
-        # The service clients are initialized globally in web_app.py
-        self.poizon = poizon_client
-        self.gigachat = gigachat_client
-        self.woocommerce = woocommerce_client
+        # The service clients are initialized once per worker process (see _ensure_services)
+        self.poizon = services.poizon_client
+        self.gigachat = services.gigachat_client
+        self.woocommerce = services.woocommerce_client
 
     def process_product(self, spu_id: int) -> dict:
         """
@@ -64,23 +91,26 @@ class ProductProcessor:
         
         try:
             # Step 1: Get data from Poizon
-            self._update_status(product_key, 'PROGRESS', 10, 'Загрузка данных из Poizon API...')
-            product = self.poizon.get_product_full_info(spu_id)
+            self._update_status(product_key, 'PROGRESS', 10, MSG_LOADING_POIZON)
+            product = services.cached_full_info(spu_id)
             if not product:
                 raise ValueError('Не удалось загрузить информацию о товаре из Poizon API.')
 
             # Clean brand and article number
             original_brand = product.brand
             product.brand = self._extract_latin_only(product.brand) or "Brand"
-            logger.info(f"Бренд из API: '{original_brand}' → '{product.brand}'")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Бренд из API: '{original_brand}' → '{product.brand}'")
             
             original_article = product.article_number
             product.article_number = self._extract_latin_only(product.article_number) or product.article_number
-            logger.info(f"Артикул: '{original_article}' → '{product.article_number}'")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Артикул: '{original_article}' → '{product.article_number}'")
 
             # Step 2: Process through GigaChat
-            self._update_status(product_key, 'PROGRESS', 40, 'Обработка через GigaChat...')
-            seo_data = self.gigachat.translate_and_generate_seo(
+            self._update_status(product_key, 'PROGRESS', 40, MSG_GIGACHAT)
+            # Through the batch queue: products processed concurrently in this worker share a request
+            seo_data = services.seo_queue.generate(
                 title=product.title,
                 description=product.description,
                 category=product.category,
@@ -100,7 +130,7 @@ class ProductProcessor:
                 self._translate_variation_colors(product.variations)
 
             # Step 3: Check and upload to WordPress
-            self._update_status(product_key, 'PROGRESS', 70, 'Проверка товара в WordPress...')
+            self._update_status(product_key, 'PROGRESS', 70, MSG_CHECKING_WORDPRESS)
             existing_id = self.woocommerce.product_exists(product.sku)
             
             if existing_id:
@@ -108,7 +138,7 @@ class ProductProcessor:
                 updated_count = self.woocommerce.update_product_variations(existing_id, product, self.settings)
                 message = f'Обновлен товар ID {existing_id} ({updated_count} вариаций)'
             else:
-                self._update_status(product_key, 'PROGRESS', 75, 'Создание нового товара...')
+                self._update_status(product_key, 'PROGRESS', 75, MSG_CREATING_PRODUCT)
                 new_id = self.woocommerce.create_product(product, self.settings)
                 if not new_id:
                     raise ValueError('Ошибка создания товара в WordPress.')
@@ -116,12 +146,12 @@ class ProductProcessor:
 
             # Step 4: Done
             final_status = self._update_status(product_key, 'SUCCESS', 100, message)
-            return asdict(final_status)
+            return final_status.to_dict()
 
         except Exception as e:
-            logger.error(f"Ошибка обработки товара {spu_id}: {e}", exc_info=True)
+            logger.error("Ошибка обработки товара %s: %s", spu_id, e, exc_info=True)
             final_status = self._update_status(product_key, 'FAILURE', 0, f'Ошибка: {str(e)}')
-            return asdict(final_status)
+            return final_status.to_dict()
 
     def _update_status(self, product_id: str, status: str, progress: int, message: str) -> ProcessingStatus:
         """Updates the Celery task state with the current progress."""
@@ -130,13 +160,13 @@ class ProductProcessor:
             status=status,
             progress=progress,
             message=message,
-            timestamp=datetime.now().isoformat()
+            timestamp=time.time()
         )
         
         # Update Celery task state
         self.celery_task.update_state(
             state='PROGRESS',
-            meta=asdict(status_obj)
+            meta=status_obj.to_dict()
         )
         return status_obj
 
@@ -146,7 +176,7 @@ class ProductProcessor:
         if not unique_colors:
             return
             
-        logger.info(f"Переводим {len(unique_colors)} уникальных цветов...")
+        logger.info("Переводим %s уникальных цветов...", len(unique_colors))
         color_translations = {color: self.gigachat.translate_color(color) for color in unique_colors}
         
         for variation in variations:
@@ -158,7 +188,20 @@ class ProductProcessor:
         """Extracts Latin letters, numbers, and basic punctuation."""
         if not text:
             return ""
-        return "".join(re.findall(r"[a-zA-Z0-9\s\-\./]+", text)).strip()
+        return "".join(_LATIN_CHUNK_RE.findall(text)).strip()
+
+
+def _ensure_services():
+    """
+    Initializes the service clients in this worker process on first use.
+
+    The clients must be read from the services module at call time: a
+    `from services import poizon_client` at import would keep the initial None.
+    """
+    if (not services.poizon_client or not services.woocommerce_client or not services.gigachat_client
+            or not services.seo_queue):
+        logger.info("Один из клиентов не инициализирован. Выполняется init_services() в воркере...")
+        init_services()
 
 
 @celery.task(bind=True)
@@ -171,13 +214,9 @@ def process_product_task(self, spu_id: int, settings_data: dict):
         spu_id: The Poizon SPU ID of the product to process.
         settings_data: A dictionary with sync settings (currency_rate, markup_rubles).
     """
-    # Ensure services are initialized in the worker process
-    # This is a simple way to do it; a more robust solution might use Celery signals
-    if not poizon_client or not woocommerce_client or not gigachat_client:
-        logger.info("Один из клиентов не инициализирован. Выполняется init_services() в воркере...")
-        init_services()
+    _ensure_services()
 
-    logger.info(f"Запуск задачи для товара {spu_id} с настройками: {settings_data}")
+    logger.info("Запуск задачи для товара %s с настройками: %s", spu_id, settings_data)
     
     settings = SyncSettings(
         currency_rate=settings_data.get('currency_rate', 13.5),
@@ -189,3 +228,265 @@ def process_product_task(self, spu_id: int, settings_data: dict):
     
     # The final result of the task will be the last status update
     return result
+
+
+# WooCommerce product fields read by _price_update_fields (requested with _fields)
+PRICE_UPDATE_WC_FIELDS = ['sku', 'name', 'meta_data']
+
+
+def _price_update_fields(wc_product: dict) -> dict:
+    """The few WooCommerce product fields a price update needs (keeps task payloads small)."""
+    # reversed: a repeated meta key keeps its first value (as WooCommerce get_meta does)
+    meta_map = {meta.get('key'): meta.get('value') for meta in reversed(wc_product.get('meta_data') or [])}
+    return {
+        'sku': wc_product.get('sku', ''),
+        'name': wc_product.get('name', ''),
+        'spu_id': meta_map.get('_poizon_spu_id'),
+    }
+
+
+@celery.task
+def start_price_update_task(product_ids: list, settings_data: dict, session_id: str):
+    """
+    Fans out a price/stock update over the Celery workers.
+
+    Loads the WordPress products in batches, then runs one
+    update_product_prices_task per product as a chord whose callback,
+    finish_price_update_task, reports the totals. Progress goes to the
+    session's Redis stream (see progress.py), read by the SSE endpoint.
+    """
+    total = len(product_ids)
+    try:
+        _ensure_services()
+        progress.push(session_id, {
+            'type': 'start',
+            'total': total,
+            'message': f'Начинаем обновление {total} товаров...'
+        })
+
+        # Load all WordPress products in batches up front
+        wc_products = {
+            wc_product_id: _price_update_fields(wc_product)
+            for wc_product_id, wc_product in services.woocommerce_client.get_products_by_ids(
+                product_ids, fields=PRICE_UPDATE_WC_FIELDS
+            ).items()
+        }
+
+        # One HMGET for all products without a saved spuId instead of an HGET per task
+        unresolved = [fields for fields in wc_products.values() if fields['spu_id'] is None and fields['sku']]
+        if unresolved and not spu_index.exists() and spu_index.claim_rebuild():
+            # Without the index every such product goes through the fuzzy Poizon search
+            # until the next beat run; rebuild it now (used by the next updates)
+            logger.warning("Индекс SKU → spuId отсутствует, запускаем перестроение")
+            refresh_spu_index_task.delay()
+        indexed = spu_index.get_many([fields['sku'] for fields in unresolved])
+        for fields in unresolved:
+            fields['indexed_spu_id'] = indexed[fields['sku']]
+
+        chord(
+            update_product_prices_task.s(
+                idx, total, wc_product_id,
+                wc_products.get(wc_product_id),
+                settings_data, session_id
+            )
+            for idx, wc_product_id in enumerate(product_ids, 1)
+        )(finish_price_update_task.s(session_id))
+
+    except Exception as e:
+        logger.error("Критическая ошибка запуска обновления цен: %s", e, exc_info=True)
+        progress.push(session_id, {
+            'type': 'error',
+            'message': f'Критическая ошибка: {str(e)}'
+        })
+        progress.push(session_id, progress.DONE)
+
+
+def _status_update(session_id: str, message: str):
+    progress.push(session_id, {'type': 'status_update', 'message': message})
+
+
+def _product_done(session_id: str, idx: int, wc_product_id: int, status: str, message: str, result: dict) -> dict:
+    progress.push(session_id, {
+        'type': 'product_done',
+        'current': idx,
+        'product_id': wc_product_id,
+        'status': status,
+        'message': message
+    })
+    return result
+
+
+@celery.task
+def update_product_prices_task(idx: int, total: int, wc_product_id: int, wc_fields: dict,
+                               settings_data: dict, session_id: str):
+    """
+    Updates prices and stock of one WooCommerce product from Poizon.
+
+    Returns:
+        A result dict for finish_price_update_task, or None if the SSE client
+        is already gone (the remaining products are skipped without any API calls).
+    """
+    # The client closed the SSE stream - do not spend Poizon/WordPress requests
+    if not progress.is_active(session_id):
+        return None
+
+    _ensure_services()
+    poizon_client = services.poizon_client
+    woocommerce_client = services.woocommerce_client
+    settings = SyncSettings(
+        currency_rate=settings_data.get('currency_rate', 13.5),
+        markup_rubles=settings_data.get('markup_rubles', 5000)
+    )
+
+    progress.push(session_id, {
+        'type': 'product_start',
+        'current': progress.next_started(session_id),
+        'total': total,
+        'product_id': wc_product_id,
+        'message': f'[{idx}/{total}] Обработка товара ID {wc_product_id}...'
+    })
+
+    try:
+        if wc_fields is None:
+            _status_update(session_id, MSG_LOADING_WORDPRESS)
+            url = f"{woocommerce_client.url}/wp-json/wc/v3/products/{wc_product_id}"
+            response = woocommerce_client.session.get(
+                url, params={'_fields': ','.join(PRICE_UPDATE_WC_FIELDS)}, timeout=30
+            )
+            response.raise_for_status()
+            wc_fields = _price_update_fields(json_codec.loads(response.content))
+
+        sku = wc_fields['sku']
+        product_name = wc_fields['name']
+        logger.info("Товар WordPress ID %s: SKU='%s', Название='%s'", wc_product_id, sku, product_name)
+
+        # Prefer the spuId saved in meta_data (more reliable than a search)
+        spu_id = wc_fields['spu_id']
+        if spu_id is not None:
+            spu_id = int(spu_id)
+            logger.info("  Используем сохраненный spuId: %s (надежно!)", spu_id)
+        else:
+            if not sku:
+                return _product_done(
+                    session_id, idx, wc_product_id, 'error', 'SKU и spuId не найдены',
+                    {'product_id': wc_product_id, 'status': 'error', 'message': 'SKU не найден'}
+                )
+
+            # Fallback: the shared SKU index (usually preloaded by start_price_update_task),
+            # then a Poizon search by SKU
+            if 'indexed_spu_id' in wc_fields:
+                spu_id = wc_fields['indexed_spu_id']
+            else:
+                spu_id = spu_index.get(sku)
+            if spu_id is not None:
+                logger.info("  Используем spuId из индекса SKU: %s", spu_id)
+            else:
+                _status_update(session_id, MSG_SEARCHING_SKU.format(sku))
+
+                search_results = poizon_client.search_products(sku, limit=1)
+                logger.info("Fallback: поиск по SKU '%s' - найдено=%d", sku, len(search_results) if search_results else 0)
+
+                if not search_results:
+                    return _product_done(
+                        session_id, idx, wc_product_id, 'error', f'[{idx}/{total}] Товар не найден в Poizon',
+                        {'product_id': wc_product_id, 'status': 'error', 'message': 'Товар не найден в Poizon'}
+                    )
+
+                spu_id = search_results[0].get('spuId')
+                logger.warning("  Используем spuId из поиска: %s (может быть неточно!)", spu_id)
+
+                # Save the spuId in the index and in meta_data for future updates (not critical if it fails)
+                try:
+                    if spu_id:
+                        spu_index.set_many({sku: spu_id})
+                    update_url = f"{woocommerce_client.url}/wp-json/wc/v3/products/{wc_product_id}"
+                    update_data = {'meta_data': [{'key': '_poizon_spu_id', 'value': str(spu_id)}]}
+                    woocommerce_client.session.put(update_url, json=update_data, timeout=30)
+                    logger.info("  Сохранен spuId в meta_data для будущих обновлений")
+                except Exception:
+                    pass
+
+        # One status line per product step that actually waits on an API; the outcome
+        # is reported by product_done
+        _status_update(session_id, MSG_UPDATING_PRICES.format(spu_id))
+
+        # Fast path: prices and stock only, no images/translations/categories
+        updated = woocommerce_client.update_product_prices_only(
+            wc_product_id,
+            spu_id,
+            settings.currency_rate,
+            settings.markup_rubles,
+            poizon_client
+        )
+
+        if updated < 0:
+            return _product_done(
+                session_id, idx, wc_product_id, 'error', f'[{idx}/{total}] Не удалось получить цены',
+                {'product_id': wc_product_id, 'status': 'error', 'message': 'Не удалось получить цены'}
+            )
+
+        if updated > 0:
+            return _product_done(
+                session_id, idx, wc_product_id, 'completed', f'[{idx}/{total}] {product_name}: обновлено {updated} вариаций',
+                {
+                    'product_id': wc_product_id,
+                    'product_name': product_name,
+                    'status': 'completed',
+                    'message': f'Обновлено вариаций: {updated}'
+                }
+            )
+
+        return _product_done(
+            session_id, idx, wc_product_id, 'warning', f'[{idx}/{total}] {product_name}: SKU не совпадают',
+            {'product_id': wc_product_id, 'status': 'warning', 'message': 'Нет совпадающих вариаций'}
+        )
+
+    except Exception as e:
+        logger.error("Ошибка обновления товара %s: %s", wc_product_id, e)
+        return _product_done(
+            session_id, idx, wc_product_id, 'error', f'[{idx}/{total}] Ошибка: {str(e)}',
+            {'product_id': wc_product_id, 'status': 'error', 'message': str(e)}
+        )
+
+
+@celery.task
+def finish_price_update_task(results: list, session_id: str):
+    """Chord callback: sends the final summary and closes the progress stream."""
+    if not progress.is_active(session_id):
+        logger.warning("Клиент отключился, обновление цен остановлено")
+        return
+
+    results = [r for r in results if r is not None]
+    updated_count = sum(1 for r in results if r['status'] == 'completed')
+    error_count = sum(1 for r in results if r['status'] == 'error')
+
+    progress.push(session_id, {
+        'type': 'complete',
+        'results': results,
+        'total': len(results),
+        'updated': updated_count,
+        'errors': error_count,
+        'message': f'Готово! Обновлено: {updated_count}, Ошибок: {error_count}'
+    })
+    progress.push(session_id, progress.DONE)
+
+
+@celery.task
+def refresh_spu_index_task():
+    """
+    Periodic task (celery beat): copies the _poizon_spu_id meta of every
+    WooCommerce product into the shared SKU index (see spu_index.py).
+    """
+    _ensure_services()
+    mapping = {}
+    for wc_product in services.woocommerce_client.get_all_products(fields=PRICE_UPDATE_WC_FIELDS):
+        fields = _price_update_fields(wc_product)
+        if fields['sku'] and fields['spu_id']:
+            try:
+                mapping[fields['sku']] = int(fields['spu_id'])
+            except (TypeError, ValueError):
+                continue
+
+    spu_index.set_many(mapping)
+    logger.info("Индекс SKU → spuId обновлен: %d товаров", len(mapping))
+    return len(mapping)
@@ -28,30 +28,43 @@
 """
 import os
 import logging
-import requests
-import json
+import re
+import json_codec
 from typing import Dict, List, Optional
-from flask import Flask, render_template, jsonify, request, Response, stream_with_context, redirect, url_for, flash
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, redirect, url_for, flash, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
-from dataclasses import dataclass, asdict
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from celery_app import celery
 from pathlib import Path
 import time
 import uuid
+import hashlib
+import threading
 from datetime import datetime
 
 # Импорт задач Celery
-from tasks import process_product_task
+from tasks import process_product_task, start_price_update_task
+import progress
+import redis_store
 
 # Импорт существующих модулей и сервисов
 from poizon_to_wordpress_service import SyncSettings
+import services
 from services import init_services, poizon_client, woocommerce_client, gigachat_client
 
 
 # Настройка логирования (конфигурируем root logger для совместимости с Flask)
+import atexit
 import logging.handlers
+import queue
+
+# Загрузка переменных окружения (нужны уже для уровня логирования)
+load_dotenv()
 
 # Создаем папку для логов если не существует
 from pathlib import Path
@@ -60,39 +73,39 @@ log_dir.mkdir(parents=True, exist_ok=True)
 
 # Создаем и настраиваем handlers
 file_handler = logging.FileHandler('kash/web_app.log', encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
 console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.DEBUG)
 
 # Формат логов
 formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 file_handler.setFormatter(formatter)
 console_handler.setFormatter(formatter)
 
-# Настраиваем root logger
+# Запись в файл и консоль - в отдельном потоке: рабочие потоки только кладут
+# запись в очередь и не ждут диск
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Настраиваем root logger: DEBUG только в режиме отладки (или явно через LOG_LEVEL)
+debug_mode = os.getenv('WEB_APP_DEBUG', 'True').lower() == 'true'
 root_logger = logging.getLogger()
-root_logger.setLevel(logging.DEBUG)
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
+root_logger.setLevel(os.getenv('LOG_LEVEL', 'DEBUG' if debug_mode else 'INFO').upper())
+# QueueHandler - единственный handler root logger: handlers, добавленные
+# раньше при импорте других модулей, писали бы на диск из рабочего потока
+root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
 
 # Отключаем DEBUG логи от сторонних библиотек (urllib3, requests и т.д.)
 logging.getLogger('urllib3').setLevel(logging.WARNING)
 logging.getLogger('requests').setLevel(logging.WARNING)
 
-# Настраиваем werkzeug чтобы избежать дублирования
+# werkzeug пишет через root logger (своих handlers нет - записи не дублируются)
 werkzeug_logger = logging.getLogger('werkzeug')
 werkzeug_logger.setLevel(logging.INFO)
-werkzeug_logger.propagate = False  # Не передавать логи root logger (избегаем дублей)
-# Добавляем наши handlers напрямую к werkzeug
-werkzeug_logger.addHandler(file_handler)
-werkzeug_logger.addHandler(console_handler)
 
 # Используем root logger напрямую (уже настроен выше с file_handler + console_handler)
 logger = root_logger
 
-# Загрузка переменных окружения
-load_dotenv()
-
 # Инициализация Flask
 app = Flask(__name__)
 # Используем фиксированный SECRET_KEY из .env для стабильности сессий между перезапусками
@@ -103,6 +116,67 @@ if not secret_key:
 app.config['SECRET_KEY'] = secret_key
 app.config['JSON_AS_ASCII'] = False
 
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """
+    JSON провайдер Flask на json_codec (orjson/ujson вместо stdlib json).
+    
+    Все jsonify() в приложении сериализуются C-энкодером; кириллица и иероглифы
+    отдаются как UTF-8, а не \\uXXXX. Типы, которые не умеет бэкенд
+    (например, словари с нестроковыми ключами для orjson),
+    сериализуются стандартным провайдером Flask.
+    """
+    ensure_ascii = False
+    
+    def _dumps_bytes(self, obj) -> bytes:
+        try:
+            return json_codec.dumps(obj, default=self.default)
+        except TypeError:
+            return super().dumps(obj).encode('utf-8')
+    
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            # Нестандартные опции (indent и т.п.) - через stdlib
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
+
+app.json = CodecJSONProvider(app)
+
+
+def oj(obj, status: int = 200) -> Response:
+    """
+    JSON ответ через json_codec (orjson/ujson - быстрее jsonify для больших списков брендов/категорий).
+    
+    Сразу отдает UTF-8 bytes, кириллица и иероглифы не экранируются
+    (json_codec.dumps не включает опций, возвращающих экранирование вида \\uXXXX).
+    """
+    return app.response_class(json_codec.dumps(obj), status=status, mimetype='application/json')
+
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """
+    Общий обработчик необработанных исключений: JSON ответ в едином формате.
+    
+    HTTP ошибки Flask/Werkzeug (404, 405, 401 и т.д.) возвращаются как есть.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    logger.exception(f"Ошибка обработки запроса {request.path}: {e}")
+    return oj({
+        'success': False,
+        'error': str(e)
+    }, 500)
+
+
 # ============================================================================
 # АВТОРИЗАЦИЯ (Flask-Login)
 # ============================================================================
@@ -194,31 +268,35 @@ def verify_password(username: str, password: str) -> bool:
     logger.error("ADMIN_PASSWORD или ADMIN_PASSWORD_HASH не установлены в .env - авторизация отключена!")
     return False
 
-import redis
-
 # ============================================================================
 # КЭШИРОВАНИЕ (Redis)
 # ============================================================================
 
 class RedisCache:
     """
-    Унифицированный кэш на основе Redis с TTL и JSON-сериализацией.
+    Унифицированный кэш на основе Redis с TTL и JSON-сериализацией (json_codec).
     
     Заменяет SimpleCache и BrandFileCache, обеспечивая общий кэш для
     всех рабочих процессов в production-среде.
+    
+    Все ключи хранятся с префиксом: в той же базе Redis лежат прогресс задач,
+    индекс SKU, очереди Celery, и clear() удаляет только ключи кэша.
     """
-    def __init__(self, redis_url: str):
+    def __init__(self, redis_client, prefix: str = redis_store.CACHE_PREFIX):
         """
-        Инициализация клиента Redis.
+        Инициализация кэша.
         
         Args:
-            redis_url: URL для подключения к Redis.
+            redis_client: Клиент Redis (redis_store.client()).
+            prefix: Префикс ключей кэша.
         """
+        self.prefix = prefix
         try:
-            # decode_responses=True автоматически декодирует ответы из UTF-8
-            self.redis = redis.from_url(redis_url, decode_responses=True)
+            # Ответы остаются bytes: json_codec разбирает их без промежуточной строки,
+            # а готовые тела ответов отдаются клиенту как есть
+            self.redis = redis_client
             self.redis.ping()
-            logger.info(f"[CACHE] Успешное подключение к Redis: {redis_url}")
+            logger.info(f"[CACHE] Успешное подключение к Redis: {redis_store.REDIS_URL}")
         except Exception as e:
             logger.error(f"[CACHE] Ошибка подключения к Redis: {e}")
             logger.error("[CACHE] Кэширование будет отключено.")
@@ -244,10 +322,10 @@ class RedisCache:
             return None
             
         try:
-            value = self.redis.get(key)
+            value = self.redis.get(self.prefix + key)
             if value:
                 self.stats['hits'] += 1
-                return json.loads(value)
+                return json_codec.loads(value)
             else:
                 self.stats['misses'] += 1
                 return None
@@ -268,12 +346,64 @@ class RedisCache:
             return
             
         try:
-            serialized_value = json.dumps(value)
-            self.redis.set(key, serialized_value, ex=ttl)
+            self.redis.set(self.prefix + key, json_codec.dumps(value), ex=ttl)
             self.stats['sets'] += 1
         except Exception as e:
             logger.error(f"[CACHE] Ошибка сохранения ключа '{key}' в Redis: {e}")
 
+    def get_raw(self, key: str) -> Optional[bytes]:
+        """
+        Получить уже сериализованное значение (готовое тело ответа) без разбора JSON.
+        
+        Args:
+            key: Ключ для поиска.
+            
+        Returns:
+            Байты из Redis или None, если ключ не найден.
+        """
+        if not self.redis:
+            return None
+            
+        try:
+            value = self.redis.get(self.prefix + key)
+            self.stats['hits' if value is not None else 'misses'] += 1
+            return value
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка получения ключа '{key}' из Redis: {e}")
+            return None
+
+    def set_raw(self, key: str, value, ttl: int = 3600):
+        """
+        Сохранить уже сериализованное значение (str/bytes) без сериализации.
+        
+        Args:
+            key: Ключ для сохранения.
+            value: Сериализованное значение.
+            ttl: Время жизни в секундах.
+        """
+        if not self.redis:
+            return
+            
+        try:
+            self.redis.set(self.prefix + key, value, ex=ttl)
+            self.stats['sets'] += 1
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка сохранения ключа '{key}' в Redis: {e}")
+
+    def acquire_lock(self, key: str, ttl: int) -> bool:
+        """
+        Простая межпроцессная блокировка (SET NX EX), снимается сама по истечении ttl.
+        
+        Без Redis всегда возвращает True (работаем как единственный процесс).
+        """
+        if not self.redis:
+            return True
+        try:
+            return bool(self.redis.set(f"{self.prefix}lock:{key}", '1', nx=True, ex=ttl))
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка блокировки '{key}' в Redis: {e}")
+            return False
+
     def get_or_fetch(self, key: str, fetch_function: callable, ttl: int) -> Optional[any]:
         """
         Получает данные из кэша или выполняет функцию для их получения и кэширования.
@@ -309,8 +439,8 @@ class RedisCache:
         hit_rate = (self.stats['hits'] / total * 100) if total > 0 else 0
         
         try:
-            # Получаем реальное количество ключей из Redis
-            cached_items = self.redis.dbsize()
+            # Количество ключей кэша (SCAN по префиксу, без остальных данных базы)
+            cached_items = sum(1 for _ in self.redis.scan_iter(match=f"{self.prefix}*", count=1000))
         except Exception:
             cached_items = -1 # Ошибка подключения
 
@@ -322,20 +452,244 @@ class RedisCache:
             'cached_items': cached_items
         }
 
+    def generation(self) -> int:
+        """Номер поколения кэша (растет при каждой очистке); 0 без Redis"""
+        if not self.redis:
+            return 0
+        try:
+            return int(self.redis.get(redis_store.CACHE_GENERATION_KEY) or 0)
+        except Exception as e:
+            logger.error(f"[CACHE] Ошибка чтения поколения кэша: {e}")
+            return 0
+
     def clear(self):
-        """Очистить весь кэш (в текущей базе данных Redis)"""
+        """
+        Очистить кэш: удаляются только ключи с префиксом кэша.
+        Поколение увеличивается, и кэши в памяти других воркеров сбрасываются сами.
+        
+        Не flushdb: в той же базе прогресс идущих задач, индекс SKU и очереди Celery.
+        """
         if not self.redis:
             return
         try:
-            self.redis.flushdb()
-            logger.info("[CACHE] Кэш Redis (текущая БД) полностью очищен.")
+            deleted = 0
+            batch = []
+            for key in self.redis.scan_iter(match=f"{self.prefix}*", count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    deleted += self.redis.unlink(*batch)
+                    batch = []
+            if batch:
+                deleted += self.redis.unlink(*batch)
+            # После удаления: воркер, успевший взять в память удаляемое тело, увидит новое поколение
+            self.redis.incr(redis_store.CACHE_GENERATION_KEY)
+            logger.info(f"[CACHE] Кэш Redis очищен, удалено ключей: {deleted}")
         except Exception as e:
             logger.error(f"[CACHE] Ошибка очистки кэша Redis: {e}")
 
 
+# Как часто кэш процесса проверяет, не очистили ли кэш в другом воркере (секунды)
+GENERATION_CHECK_INTERVAL = float(os.getenv('CACHE_GENERATION_CHECK_INTERVAL', 1))
+
+
+class LocalTTLCache:
+    """
+    Небольшой кэш в памяти процесса с TTL на каждую запись (L1 перед Redis).
+    
+    Для готовых тел ответов, которые запрашиваются часто и меняются редко:
+    попадание - это поиск в словаре, без сетевого запроса к Redis.
+    
+    Очистка кэша в другом воркере видна через generation() (поколение в Redis):
+    оно перепроверяется не чаще раза в GENERATION_CHECK_INTERVAL секунд, при
+    смене поколения кэш процесса сбрасывается.
+    """
+    def __init__(self, maxsize: int = 32, generation: callable = None):
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+        self._generation_source = generation
+        self._generation = generation() if generation else 0
+        self._next_generation_check = time.monotonic() + GENERATION_CHECK_INTERVAL
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if now < self._next_generation_check:
+            return
+        self._next_generation_check = now + GENERATION_CHECK_INTERVAL
+        generation = self._generation_source()
+        if generation != self._generation:
+            with self._lock:
+                self._data.clear()
+                self._generation = generation
+
+    def get(self, key: str):
+        if self._generation_source is not None:
+            self._check_generation()
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                # Удаляем самую старую запись (словарь хранит порядок вставки)
+                self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
 # Создаем глобальный кэш на основе Redis
-redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-cache = RedisCache(redis_url)
+cache = RedisCache(redis_store.client())
+
+# Кэш готовых JSON ответов (/api/brands, /api/categories)
+API_RESPONSE_CACHE_TTL = int(os.getenv('API_RESPONSE_CACHE_TTL', 300))
+# Сколько хранить последний удачный ответ для отдачи при ошибке Poizon API
+API_RESPONSE_STALE_TTL = 7 * 24 * 60 * 60  # 7 дней
+
+# L1 кэш готовых ответов в памяти процесса
+local_cache = LocalTTLCache(generation=cache.generation)
+
+# Ключ общего (для всех воркеров) кэша брендов категории
+BRANDS_BY_CATEGORY_KEY = 'poizon:brands:cat:{}'
+
+
+def shared_cache_get(key: str):
+    """
+    Значение из общего Redis кэша; если Redis недоступен или ключа там нет -
+    из кэша процесса (его заполняет shared_cache_set).
+    """
+    value = cache.get(key)
+    if value is None:
+        value = local_cache.get(key)
+    return value
+
+
+def shared_cache_set(key: str, value, ttl: int):
+    """Сохраняет значение в Redis (общий для воркеров) и в кэш процесса (запасной)"""
+    cache.set(key, value, ttl=ttl)
+    local_cache.set(key, value, ttl=ttl)
+
+
+def stream_json_list(head: Dict, list_key: str, items) -> Response:
+    """
+    Потоковый JSON ответ вида {**head, list_key: [...]}.
+    
+    Элементы сериализуются и отправляются по одному: весь список в виде
+    JSON строки в памяти не собирается, первые байты уходят клиенту сразу.
+    
+    Args:
+        head: Непустой словарь с полями ответа кроме списка.
+        list_key: Имя поля со списком.
+        items: Итерируемый источник элементов списка.
+    """
+    dumps = json_codec.dumps
+    
+    def generate():
+        yield dumps(head)[:-1] + b',' + dumps(list_key) + b':['
+        first = True
+        for item in items:
+            if first:
+                first = False
+                yield dumps(item)
+            else:
+                yield b',' + dumps(item)
+        yield b']}'
+    
+    return app.response_class(generate(), mimetype='application/json')
+
+
+# Сколько браузер может использовать закэшированный ответ без перепроверки
+API_RESPONSE_BROWSER_MAX_AGE = int(os.getenv('API_RESPONSE_BROWSER_MAX_AGE', 300))
+
+
+def _json_body_response(body, max_age: int = API_RESPONSE_BROWSER_MAX_AGE) -> Response:
+    """
+    Ответ из уже сериализованного JSON тела - без повторной обработки.
+    
+    Добавляет ETag и Cache-Control: при совпадении If-None-Match
+    клиент получает 304 без тела.
+    
+    Args:
+        body: JSON тело (bytes или str).
+        max_age: Сколько секунд браузер использует ответ без перепроверки.
+    """
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    
+    response = app.response_class(body, mimetype='application/json', direct_passthrough=True)
+    response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+    # private: ответы доступны только после авторизации, общим кэшам (CDN) их хранить нельзя
+    response.headers['Cache-Control'] = f'private, max-age={max_age}'
+    if not has_request_context():
+        # Вызов вне запроса (прогрев кэша при старте)
+        return response
+    return response.make_conditional(request)
+
+
+def cached_json_response(key: str, build_payload: callable, is_cacheable: callable,
+                         ttl: int = API_RESPONSE_CACHE_TTL, local_ttl: int = 60) -> Response:
+    """
+    Cache-aside для JSON ответа: при попадании отдает сериализованное тело
+    из памяти процесса (L1, local_ttl) или из Redis (L2, ttl).
+    
+    При промахе вызывает build_payload(), сериализует через json_codec и сохраняет тело
+    (только если is_cacheable(payload) - пустые результаты не кэшируем).
+    Если build_payload() упал или вернул пустой результат - отдает последний удачный
+    ответ (stale), если он есть; иначе пробрасывает ошибку / отдает результат как есть.
+    
+    Args:
+        key: Ключ Redis для тела ответа.
+        build_payload: Функция, возвращающая словарь ответа.
+        is_cacheable: Проверка, стоит ли кэшировать результат.
+        ttl: Время жизни свежего ответа в Redis (секунды).
+        local_ttl: Время жизни ответа в памяти процесса (секунды).
+    """
+    body = local_cache.get(key)
+    if body is not None:
+        return _json_body_response(body)
+    
+    body = cache.get_raw(key)
+    if body is not None:
+        local_cache.set(key, body, ttl=local_ttl)
+        return _json_body_response(body)
+    
+    stale_key = f"{key}:stale"
+    try:
+        payload = build_payload()
+    except Exception as e:
+        stale_body = cache.get_raw(stale_key)
+        if stale_body is None:
+            raise
+        logger.warning(f"[CACHE] Ошибка получения данных для '{key}': {e}. Отдаем последний сохраненный ответ")
+        return _json_body_response(stale_body)
+    
+    if not is_cacheable(payload):
+        # Клиент Poizon при ошибке возвращает пустой список - предпочитаем последний удачный ответ
+        stale_body = cache.get_raw(stale_key)
+        if stale_body is not None:
+            logger.warning(f"[CACHE] Пустой результат для '{key}', отдаем последний сохраненный ответ")
+            return _json_body_response(stale_body)
+        return oj(payload)
+    
+    body = json_codec.dumps(payload)
+    _store_json_body(key, body, ttl, local_ttl)
+    return _json_body_response(body)
+
+
+def _store_json_body(key: str, body: bytes, ttl: int, local_ttl: int):
+    """Сохраняет готовое тело ответа в L1, Redis и stale-копию"""
+    local_cache.set(key, body, ttl=local_ttl)
+    cache.set_raw(key, body, ttl=ttl)
+    cache.set_raw(f"{key}:stale", body, ttl=API_RESPONSE_STALE_TTL)
 
 
 # ============================================================================
@@ -392,42 +746,248 @@ CATEGORY_KEYWORDS = {
     },
 }
 
+# Ключевые слова в нижнем регистре (приводим один раз при загрузке модуля),
+# без повторов, длинные первыми: альтернатива regex перебирается слева направо,
+# и конкретные слова ("运动鞋", "sneakers") проверяются раньше общих ("鞋")
+_CATEGORY_KEYWORDS_LC = {
+    cid: tuple(sorted({kw.lower() for kw in data['keywords']}, key=lambda kw: (-len(kw), kw)))
+    for cid, data in CATEGORY_KEYWORDS.items()
+}
 
-def filter_products_by_category(products: List[Dict], category_id: int) -> List[Dict]:
+# Одна скомпилированная альтернатива на категорию: один проход по названию
+# вместо отдельного поиска подстроки для каждого ключевого слова
+_CATEGORY_KEYWORD_RE = {
+    cid: re.compile('|'.join(map(re.escape, keywords)))
+    for cid, keywords in _CATEGORY_KEYWORDS_LC.items()
+}
+
+# С pyahocorasick (необязательная зависимость) - автомат Ахо-Корасик на категорию:
+# поиск всех ключевых слов за один проход в C, без перебора альтернатив regex
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _build_keyword_automaton(keywords: tuple):
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_CATEGORY_KEYWORD_AUTOMATA = {
+    cid: _build_keyword_automaton(keywords)
+    for cid, keywords in _CATEGORY_KEYWORDS_LC.items()
+} if ahocorasick is not None else {}
+
+# Альтернативные имена полей в ответах Poizon API (в порядке приоритета)
+_SPU_ID_KEYS = ('spuId', 'productId')
+_BRAND_KEYS = ('brandName', 'brand')
+
+
+def _first(d: Dict, keys: tuple, default=None):
+    """Значение первого присутствующего в словаре ключа из keys (один поиск в обычном случае)"""
+    return next((d[k] for k in keys if k in d), default)
+
+
+def dedupe_products(products: List[Dict]) -> List[Dict]:
     """
-    Фильтрует товары по категории на основе ключевых слов в названии
+    Убирает дубликаты товаров по spuId (товары без spuId отбрасываются).
+    
+    Проход с конца: при совпадении spuId остается первое вхождение (как и раньше),
+    позиция дубликата в списке - по его последнему вхождению.
+    """
+    unique = {
+        spu_id: product
+        for product in reversed(products)
+        if (spu_id := _first(product, _SPU_ID_KEYS))
+    }
+    return list(reversed(unique.values()))
+
+
+def iter_filter_products_by_category(products, category_id: int):
+    """
+    Генератор: отдает товары категории по одному, без промежуточного списка.
     
     Args:
-        products: Список товаров
+        products: Итерируемое товаров
         category_id: ID категории
         
-    Returns:
-        list: Отфильтрованные товары
+    Yields:
+        dict: Товары, в названии которых есть ключевое слово категории
     """
     if not category_id or category_id not in CATEGORY_KEYWORDS:
         logger.warning(f"Нет ключевых слов для категории {category_id}, показываем все товары")
-        return products
+        yield from products
+        return
     
-    keywords = CATEGORY_KEYWORDS[category_id]['keywords']
-    filtered = []
+    automaton = _CATEGORY_KEYWORD_AUTOMATA.get(category_id)
+    if automaton is not None:
+        def keyword_search(title: str) -> bool:
+            return next(automaton.iter(title), None) is not None
+    else:
+        keyword_search = _CATEGORY_KEYWORD_RE[category_id].search
     
     for product in products:
-        title = product.get('title', '').lower()
-        
         # Проверяем наличие хотя бы одного ключевого слова
-        if any(keyword.lower() in title for keyword in keywords):
-            filtered.append(product)
+        if keyword_search(product.get('title', '').lower()):
+            yield product
+
+
+def filter_products_by_category(products: List[Dict], category_id: int) -> List[Dict]:
+    """
+    Фильтрует товары по категории на основе ключевых слов в названии
     
+    Args:
+        products: Список товаров
+        category_id: ID категории
+        
+    Returns:
+        list: Отфильтрованные товары
+    """
+    filtered = list(iter_filter_products_by_category(products, category_id))
     logger.info(f"Фильтрация: {len(products)} товаров → {len(filtered)} (категория {category_id})")
     return filtered
 
 
-# Глобальные клиенты
+# Глобальные клиенты (заполняются в init_app_services)
 poizon_client = None
 woocommerce_client = None
 gigachat_client = None
 
 
+def init_app_services():
+    """
+    Инициализирует клиенты в текущем процессе и прогревает кэш ответов.
+    
+    Вызывается один раз на процесс: при запуске через python web_app.py
+    и из хука post_worker_init в gunicorn.conf.py.
+    """
+    global poizon_client, woocommerce_client, gigachat_client
+    
+    init_services()
+    # Импорт "from services import ..." копирует None, поэтому берем клиенты из модуля
+    poizon_client = services.poizon_client
+    woocommerce_client = services.woocommerce_client
+    gigachat_client = services.gigachat_client
+    
+    warm_api_response_cache()
+    start_api_cache_refresher()
+
+
+# Период фонового обновления кэша ответов (меньше API_RESPONSE_CACHE_TTL,
+# чтобы ключ в Redis обновлялся до истечения и пользователь не ждал Poizon API)
+API_CACHE_REFRESH_INTERVAL = int(os.getenv('API_CACHE_REFRESH_INTERVAL', 240))
+
+_refresher_started = False
+
+
+def _cached_endpoints():
+    """(ключ, функция построения ответа, поле со списком, TTL в памяти) для кэшируемых ответов"""
+    return (
+        ('api:brands:v1', build_brands_payload, 'brands', 300),
+        ('api:categories:v1', build_categories_payload, 'categories', 60),
+    )
+
+
+def warm_api_response_cache():
+    """
+    Заранее сериализует ответы /api/brands и /api/categories,
+    чтобы первый запрос пользователя сразу попадал в кэш.
+    """
+    for key, build_payload, list_key, local_ttl in _cached_endpoints():
+        try:
+            cached_json_response(
+                key, build_payload,
+                is_cacheable=lambda payload, k=list_key: bool(payload[k]),
+                local_ttl=local_ttl
+            )
+        except Exception as e:
+            logger.warning(f"[CACHE] Не удалось прогреть '{key}': {e}")
+
+
+def refresh_api_response_cache():
+    """
+    Обновляет кэшированные ответы заранее, до истечения TTL.
+    
+    Из Poizon API данные перезапрашивает только один процесс (блокировка в Redis),
+    остальные worker'ы просто подтягивают свежее тело из Redis в L1.
+    """
+    for key, build_payload, list_key, local_ttl in _cached_endpoints():
+        try:
+            if cache.acquire_lock(f"{key}:refresh", ttl=API_CACHE_REFRESH_INTERVAL):
+                payload = build_payload()
+                if payload[list_key]:
+                    _store_json_body(key, json_codec.dumps(payload), API_RESPONSE_CACHE_TTL, local_ttl)
+                    logger.info(f"[CACHE] Ответ '{key}' обновлен в фоне")
+            else:
+                body = cache.get_raw(key)
+                if body is not None:
+                    local_cache.set(key, body, ttl=local_ttl)
+        except Exception as e:
+            logger.warning(f"[CACHE] Ошибка фонового обновления '{key}': {e}")
+
+
+# Период фонового обновления списка брендов ('all_brands') и индекса брендов по имени.
+# Меньше TTL индекса в памяти (BRAND_INFO_MAP_TTL), поэтому пользовательские запросы
+# не попадают на промах и не ждут загрузки брендов из Poizon API
+BRAND_INFO_REFRESH_INTERVAL = int(os.getenv('BRAND_INFO_REFRESH_INTERVAL', 6 * 60 * 60))
+ALL_BRANDS_CACHE_TTL = 30 * 24 * 60 * 60  # 30 дней
+
+
+def refresh_brand_info_cache():
+    """
+    Перезагружает все бренды из Poizon API в Redis (один процесс, блокировка в Redis)
+    и пересобирает индекс брендов по имени в памяти текущего процесса.
+    
+    Пока идет обновление, эндпоинты продолжают отдавать прежний список из Redis.
+    """
+    try:
+        if cache.acquire_lock('all_brands:refresh', ttl=BRAND_INFO_REFRESH_INTERVAL):
+            brands = fetch_all_brands_from_api(poizon_client)
+            if brands:
+                cache.set('all_brands', brands, ttl=ALL_BRANDS_CACHE_TTL)
+                logger.info(f"[CACHE] Список брендов обновлен в фоне ({len(brands)} шт)")
+        
+        brand_info_map = {b['name']: b for b in _load_all_brands_info()}
+        if brand_info_map:
+            local_cache.set('all_brands_by_name', brand_info_map, ttl=BRAND_INFO_MAP_TTL)
+    except Exception as e:
+        logger.warning(f"[CACHE] Ошибка фонового обновления брендов: {e}")
+
+
+def _api_cache_refresh_loop():
+    next_brands_refresh = time.monotonic() + BRAND_INFO_REFRESH_INTERVAL
+    while True:
+        time.sleep(API_CACHE_REFRESH_INTERVAL)
+        refresh_api_response_cache()
+        if BRAND_INFO_REFRESH_INTERVAL > 0 and time.monotonic() >= next_brands_refresh:
+            refresh_brand_info_cache()
+            next_brands_refresh = time.monotonic() + BRAND_INFO_REFRESH_INTERVAL
+
+
+def start_api_cache_refresher():
+    """Запускает фоновый поток обновления кэша ответов (один на процесс)"""
+    global _refresher_started
+    if _refresher_started or API_CACHE_REFRESH_INTERVAL <= 0:
+        return
+    _refresher_started = True
+    threading.Thread(target=_api_cache_refresh_loop, name='api-cache-refresher', daemon=True).start()
+
+
+# ============================================================================
+# ПРОГРЕСС ОБНОВЛЕНИЯ (SSE)
+# ============================================================================
+
+# Интервал keep-alive комментариев в SSE потоке (секунды)
+PROGRESS_KEEPALIVE_SECONDS = 15
+
+# Постоянные SSE кадры - сериализованы один раз
+_SSE_KEEPALIVE = b': keep-alive\n\n'
+_SSE_DONE = b'data: {"type": "done"}\n\n'
+
 
 # ============================================================================
 # API ENDPOINTS
@@ -530,6 +1090,17 @@ def update_page():
 # ЗАГРУЗКА БРЕНДОВ (вспомогательные функции)
 # ============================================================================
 
+# Служебные "бренды" Poizon, которые не показываем пользователю
+# ("Горячие серии" в разных локализациях); новые варианты добавляются сюда
+_HIDDEN_BRAND_NAMES = frozenset({'热门系列', 'Hot Series', 'Горячие серии'})
+
+# Сколько страниц брендов запрашивать у Poizon одновременно
+BRAND_PAGES_PARALLEL = int(os.getenv('BRAND_PAGES_PARALLEL', 5))
+
+# Максимум параллельных поисковых запросов к Poizon (термины категории, страницы товаров)
+SEARCH_PARALLEL = int(os.getenv('SEARCH_PARALLEL', 8))
+
+
 def fetch_all_brands_from_api(api_client) -> List[Dict]:
     """
     Загружает ВСЕ бренды из Poizon API через пагинацию.
@@ -545,78 +1116,137 @@ def fetch_all_brands_from_api(api_client) -> List[Dict]:
     all_brands_raw = []
     page = 0
     max_pages = 50  # Максимум 5000 брендов (50 × 100)
+    finished = False
     
     logger.info("[API] Загрузка всех брендов через пагинацию...")
     
-    while page < max_pages:
-        brands_page = api_client.get_brands(limit=100, page=page)
-        
-        if not brands_page or len(brands_page) == 0:
-            logger.info(f"[API] Страница {page} пустая - все бренды загружены")
-            break
-        
-        all_brands_raw.extend(brands_page)
-        # Убрано DEBUG: информация о каждой странице
-        
-        # Если получили меньше 100, значит это последняя страница
-        if len(brands_page) < 100:
-            logger.info(f"[API] Последняя страница {page}: {len(brands_page)} брендов")
-            break
-        
-        page += 1
+    # Страницы запрашиваем пачками по BRAND_PAGES_PARALLEL параллельно
+    # (ожидание ответа Poizon доминирует, CPU почти не используется)
+    def fetch_page(page_num: int) -> List[Dict]:
+        return api_client.get_brands(limit=100, page=page_num)
+    
+    with ThreadPoolExecutor(max_workers=BRAND_PAGES_PARALLEL) as executor:
+        while page < max_pages and not finished:
+            wave = range(page, min(page + BRAND_PAGES_PARALLEL, max_pages))
+            
+            # executor.map сохраняет порядок страниц
+            for page_num, brands_page in zip(wave, executor.map(fetch_page, wave)):
+                page = page_num
+                
+                if not brands_page or len(brands_page) == 0:
+                    logger.info(f"[API] Страница {page_num} пустая - все бренды загружены")
+                    finished = True
+                    break
+                
+                all_brands_raw.extend(brands_page)
+                
+                # Если получили меньше 100, значит это последняя страница
+                if len(brands_page) < 100:
+                    logger.info(f"[API] Последняя страница {page_num}: {len(brands_page)} брендов")
+                    finished = True
+                    break
+            else:
+                page = wave.stop
     
-    logger.info(f"[API] Загружено {len(all_brands_raw)} брендов с {page + 1} страниц")
+    logger.info("[API] Загружено %d брендов с %d страниц", len(all_brands_raw), page + 1)
     
-    # Фильтруем и форматируем
-    brands_list = []
-    for brand in all_brands_raw:
-        brand_name = brand.get('name', '')
-        if brand_name and brand_name != '热门系列':  # Пропускаем "Горячие серии"
-            brands_list.append({
-                'id': brand.get('id'),
-                'name': brand_name,
-                'logo': brand.get('logo', ''),
-                'products_count': 0
-            })
+    # Фильтруем и форматируем (пропускаем служебные "бренды" вроде "Горячие серии").
+    # id обязателен: бренд без id ломает выбор на фронтенде, поэтому KeyError
+    # лучше молчаливого None (при ошибке отдается последний удачный ответ из кэша)
+    brands_list = [
+        {
+            'id': brand['id'],
+            'name': brand_name,
+            'logo': brand.get('logo') or '',
+            'products_count': 0
+        }
+        for brand in all_brands_raw
+        if (brand_name := brand.get('name')) and brand_name not in _HIDDEN_BRAND_NAMES
+    ]
     
-    logger.info(f"[API] Отфильтровано брендов: {len(brands_list)}")
+    logger.info("[API] Отфильтровано брендов: %d", len(brands_list))
     return brands_list
 
 
+# Сколько держать в памяти процесса индекс брендов по имени (логотипы и id)
+BRAND_INFO_MAP_TTL = 12 * 60 * 60  # 12 часов
+
+
+def _load_all_brands_info() -> List[Dict]:
+    """Список брендов (id, name, logo) из Redis, при промахе - первая страница из Poizon API"""
+    all_brands_info = cache.get('all_brands')
+    if not all_brands_info:
+        all_brands = poizon_client.get_brands(limit=100)
+        all_brands_info = [
+            {
+                'id': b['id'],
+                'name': name,
+                'logo': b.get('logo') or '',
+                'products_count': 0
+            }
+            for b in all_brands
+            if (name := b.get('name')) and name not in _HIDDEN_BRAND_NAMES
+        ]
+        cache.set('all_brands', all_brands_info, ttl=43200)
+    return all_brands_info
+
+
+def build_brands_payload() -> Dict:
+    """Тело ответа /api/brands: все бренды из Redis кэша (обновление раз в 30 дней)"""
+    # Используем новый Redis кэш (обновляется в фоне, см. refresh_brand_info_cache)
+    brands_list = cache.get_or_fetch(
+        key='all_brands',
+        fetch_function=lambda: fetch_all_brands_from_api(poizon_client),
+        ttl=ALL_BRANDS_CACHE_TTL
+    )
+    
+    logger.debug("[API /brands] Возвращаем %d брендов (из Redis кэша)", len(brands_list))
+    return {
+        'success': True,
+        'brands': brands_list
+    }
+
+
+def build_categories_payload() -> Dict:
+    """Тело ответа /api/categories: главные категории (level = 1) из Poizon API"""
+    # Получаем все категории
+    all_categories = poizon_client.get_categories(lang="RU")
+    
+    # Фильтруем только главные категории (level = 1)
+    main_categories = [
+        {
+            'id': cat['id'],
+            'name': cat.get('name') or '',
+            'rootId': cat.get('rootId')
+        }
+        for cat in all_categories
+        if cat.get('level') == 1
+    ]
+    
+    logger.debug("Найдено главных категорий: %d", len(main_categories))
+    return {
+        'success': True,
+        'categories': main_categories
+    }
+
+
 @app.route('/api/brands', methods=['GET'])
 def get_brands():
     """
     Получает список всех доступных брендов.
     
-    Использует Redis кэш (обновление раз в 30 дней).
+    Использует Redis кэш (данные - раз в 30 дней, готовый JSON ответ - API_RESPONSE_CACHE_TTL).
     
     Returns:
         JSON список брендов
     """
-    try:
-        # Ключ и TTL для кэша брендов
-        cache_key = "all_brands"
-        cache_ttl_seconds = 30 * 24 * 60 * 60  # 30 дней
-
-        # Используем новый Redis кэш
-        brands_list = cache.get_or_fetch(
-            key=cache_key,
-            fetch_function=lambda: fetch_all_brands_from_api(poizon_client),
-            ttl=cache_ttl_seconds
-        )
-        
-        logger.info(f"[API /brands] Возвращаем {len(brands_list)} брендов (из Redis кэша)")
-        return jsonify({
-            'success': True,
-            'brands': brands_list
-        })
-        
-    except Exception as e:
-        logger.error(f"Ошибка получения брендов: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    # Ошибки обрабатывает общий handle_unexpected_error
+    return cached_json_response(
+        'api:brands:v1',
+        build_brands_payload,
+        is_cacheable=lambda payload: bool(payload['brands']),
+        local_ttl=300  # бренды меняются редко
+    )
 
 
 @app.route('/api/categories', methods=['GET'])
@@ -624,70 +1254,63 @@ def get_categories():
     """
     Получает список категорий (главные категории первого уровня).
     
+    Готовый JSON ответ кэшируется в Redis на API_RESPONSE_CACHE_TTL секунд.
+    
     Returns:
         JSON список категорий
     """
-    try:
-        # Получаем все категории
-        all_categories = poizon_client.get_categories(lang="RU")
-        
-        # Фильтруем только главные категории (level = 1)
-        main_categories = []
-        for cat in all_categories:
-            if cat.get('level') == 1:
-                main_categories.append({
-                    'id': cat.get('id'),
-                    'name': cat.get('name', ''),
-                    'rootId': cat.get('rootId')
-                })
-        
-        logger.info(f"Найдено главных категорий: {len(main_categories)}")
-        return jsonify({
-            'success': True,
-            'categories': main_categories
-        })
-        
-    except Exception as e:
-        logger.error(f"Ошибка получения категорий: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    # Ошибки обрабатывает общий handle_unexpected_error
+    return cached_json_response(
+        'api:categories:v1',
+        build_categories_payload,
+        is_cacheable=lambda payload: bool(payload['categories'])
+    )
 
 
 # ============================================================================
 # НОВЫЕ ЭНДПОИНТЫ ДЛЯ КАТЕГОРИЙ И ПОИСКА
 # ============================================================================
 
+# Время жизни ответов в кэше браузера (совпадает с временем жизни серверного кэша)
+SIMPLIFIED_CATEGORIES_MAX_AGE = 24 * 60 * 60  # Список категорий задан в коде
+BRANDS_BY_CATEGORY_MAX_AGE = 6 * 60 * 60
+WP_CATEGORIES_MAX_AGE = 60 * 60
+
+
+def brands_response(brands_list: List[Dict]) -> Response:
+    """Ответ /api/brands/by-category с ETag и Cache-Control"""
+    return _json_body_response(json_codec.dumps({
+        'success': True,
+        'brands': brands_list,
+        'total': len(brands_list)
+    }), max_age=BRANDS_BY_CATEGORY_MAX_AGE)
+
+
+# Упрощенный список основных категорий (6 категорий вместо тысяч для удобства пользователя)
+SIMPLE_CATEGORIES = [
+    {'id': 29, 'name': 'Обувь', 'level': 1},
+    {'id': 1000095, 'name': 'Женская одежда', 'level': 1},
+    {'id': 1000096, 'name': 'Мужская одежда', 'level': 1},
+    {'id': 92, 'name': 'Аксессуары', 'level': 1},
+    {'id': 48, 'name': 'Сумки и рюкзаки', 'level': 1},
+    {'id': 278, 'name': 'Косметика и парфюмерия', 'level': 1},
+]
+
+# Список не меняется во время работы - тело ответа сериализуем один раз при импорте
+_SIMPLE_CATEGORIES_BODY = json_codec.dumps({
+    'success': True,
+    'categories': SIMPLE_CATEGORIES,
+    'total': len(SIMPLE_CATEGORIES)
+})
+
+
 @app.route('/api/categories/simplified', methods=['GET'])
 def get_simplified_categories():
     """
     Получает упрощенный список основных категорий
     (6 категорий вместо тысяч для удобства пользователя)
     """
-    try:
-        simple_categories = [
-            {'id': 29, 'name': 'Обувь', 'level': 1},
-            {'id': 1000095, 'name': 'Женская одежда', 'level': 1},
-            {'id': 1000096, 'name': 'Мужская одежда', 'level': 1},
-            {'id': 92, 'name': 'Аксессуары', 'level': 1},
-            {'id': 48, 'name': 'Сумки и рюкзаки', 'level': 1},
-            {'id': 278, 'name': 'Косметика и парфюмерия', 'level': 1},
-        ]
-        
-        logger.info(f"Возвращаем {len(simple_categories)} упрощенных категорий")
-        return jsonify({
-            'success': True,
-            'categories': simple_categories,
-            'total': len(simple_categories)
-        })
-        
-    except Exception as e:
-        logger.error(f"Ошибка получения категорий: {e}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 500
+    return _json_body_response(_SIMPLE_CATEGORIES_BODY, max_age=SIMPLIFIED_CATEGORIES_MAX_AGE)
 
 
 @app.route('/api/brands/by-category', methods=['GET'])
@@ -707,16 +1330,11 @@ def get_brands_by_category():
             }), 400
         
         # Проверяем кэш
-        cache_key = f'brands_category_{category_id}'
-        cached = cache.get(cache_key)
+        cache_key = BRANDS_BY_CATEGORY_KEY.format(category_id)
+        cached = shared_cache_get(cache_key)
         if cached:
             logger.info(f"[CACHE] Бренды категории {category_id} из кэша ({len(cached)} шт)")
-            cache.stats['requests_saved'] += 1
-            return jsonify({
-                'success': True,
-                'brands': cached,
-                'total': len(cached)
-            })
+            return brands_response(cached)
         
         logger.info(f"[API] Получение брендов для категории {category_id}...")
         
@@ -724,30 +1342,22 @@ def get_brands_by_category():
         if category_id == 29:
             logger.info(f"[ОБУВЬ] Загружаем ВСЕ бренды (из Redis кэша)")
             
-            # Ключ и TTL для кэша брендов
-            cache_key_all_brands = "all_brands"
-            cache_ttl_seconds = 30 * 24 * 60 * 60  # 30 дней
-
-            # Используем новый Redis кэш
+            # Используем новый Redis кэш (обновляется в фоне, см. refresh_brand_info_cache)
             all_brands_info = cache.get_or_fetch(
-                key=cache_key_all_brands,
+                key='all_brands',
                 fetch_function=lambda: fetch_all_brands_from_api(poizon_client),
-                ttl=cache_ttl_seconds
+                ttl=ALL_BRANDS_CACHE_TTL
             )
             
             # Сортируем по алфавиту
-            brands_list = sorted(all_brands_info, key=lambda x: x['name'])
+            brands_list = sorted(all_brands_info, key=itemgetter('name'))
             
             logger.info(f"[ОБУВЬ] Возвращаем {len(brands_list)} брендов (из Redis кэша)")
             
             # Кэшируем результат для этой категории (ID 29) на 24 часа
-            cache.set(cache_key, brands_list, ttl=86400)
+            shared_cache_set(cache_key, brands_list, ttl=86400)
             
-            return jsonify({
-                'success': True,
-                'brands': brands_list,
-                'total': len(brands_list)
-            })
+            return brands_response(brands_list)
         
         # ДЛЯ ДРУГИХ КАТЕГОРИЙ - СТАРАЯ ЛОГИКА (поиск по ключевым словам)
         
@@ -766,56 +1376,40 @@ def get_brands_by_category():
         
         all_products = []
         
-        # Ищем товары по каждому термину
-        for term in search_terms:
-            products = poizon_client.search_products(keyword=term, limit=100)
-            all_products.extend(products)
-            logger.info(f"  '{term}': найдено {len(products)} товаров")
+        # Ищем товары по всем терминам параллельно (время = самый медленный запрос, а не сумма)
+        with ThreadPoolExecutor(max_workers=min(SEARCH_PARALLEL, len(search_terms))) as executor:
+            results = executor.map(lambda term: poizon_client.search_products(keyword=term, limit=100), search_terms)
+            for term, products in zip(search_terms, results):
+                all_products.extend(products)
+                logger.info("  '%s': найдено %d товаров", term, len(products))
         
         # Дедупликация
-        unique_products = {}
-        for product in all_products:
-            spu_id = product.get('spuId', product.get('productId'))
-            if spu_id and spu_id not in unique_products:
-                unique_products[spu_id] = product
+        unique_products = dedupe_products(all_products)
         
         logger.info(f"Уникальных товаров: {len(unique_products)}")
         
-        # Фильтруем по категории
-        filtered_products = filter_products_by_category(list(unique_products.values()), category_id)
-        
-        # Извлекаем уникальные бренды
+        # Фильтруем по категории и сразу извлекаем уникальные бренды (один проход)
         brands_dict = {}
-        for product in filtered_products:
-            brand_name = product.get('brandName', product.get('brand', ''))
-            if brand_name and brand_name != '热门系列':
-                if brand_name not in brands_dict:
-                    brands_dict[brand_name] = {
-                        'id': 0,
-                        'name': brand_name,
-                        'logo': '',
-                        'products_count': 0
-                    }
-                brands_dict[brand_name]['products_count'] += 1
+        for product in iter_filter_products_by_category(unique_products, category_id):
+            brand_name = product.get('brandName') or product.get('brand')
+            if brand_name and brand_name not in _HIDDEN_BRAND_NAMES:
+                entry = brands_dict.setdefault(brand_name, {
+                    'id': 0,
+                    'name': brand_name,
+                    'logo': '',
+                    'products_count': 0
+                })
+                entry['products_count'] += 1
         
         logger.info(f"Найдено уникальных брендов: {len(brands_dict)}")
         
-        # Получаем инфо о брендах (логотипы)
-        all_brands_info = cache.get('all_brands')
-        if not all_brands_info:
-            all_brands = poizon_client.get_brands(limit=100)
-            all_brands_info = []
-            for b in all_brands:
-                if b.get('name') and b.get('name') != '热门系列':
-                    all_brands_info.append({
-                        'id': b.get('id'),
-                        'name': b.get('name'),
-                        'logo': b.get('logo', ''),
-                        'products_count': 0
-                    })
-            cache.set('all_brands', all_brands_info, ttl=43200)
-        
-        brand_info_map = {b['name']: b for b in all_brands_info}
+        # Получаем инфо о брендах (логотипы): индекс по имени держим в памяти процесса,
+        # чтобы не пересобирать его (и не разбирать список из Redis) на каждый запрос
+        brand_info_map = local_cache.get('all_brands_by_name')
+        if brand_info_map is None:
+            brand_info_map = {b['name']: b for b in _load_all_brands_info()}
+            if brand_info_map:
+                local_cache.set('all_brands_by_name', brand_info_map, ttl=BRAND_INFO_MAP_TTL)
         
         # Обогащаем данные
         brands_list = []
@@ -827,17 +1421,13 @@ def get_brands_by_category():
             brands_list.append(brand_data)
         
         # Сортируем по алфавиту
-        brands_list.sort(key=lambda x: x['name'])
+        brands_list.sort(key=itemgetter('name'))
         
         # Кэшируем на 6 часов
-        cache.set(cache_key, brands_list, ttl=21600)
+        shared_cache_set(cache_key, brands_list, ttl=21600)
         logger.info(f"[CACHE] Бренды категории {category_id} сохранены")
         
-        return jsonify({
-            'success': True,
-            'brands': brands_list,
-            'total': len(brands_list)
-        })
+        return brands_response(brands_list)
         
     except Exception as e:
         logger.error(f"Ошибка получения брендов категории: {e}")
@@ -847,6 +1437,32 @@ def get_brands_by_category():
         }), 500
 
 
+# Карточки товаров для ручного поиска по SPU ID (пользователи часто вводят одни и те же ID)
+PRODUCT_DETAIL_CACHE_TTL = 60 * 60  # 1 час
+product_detail_cache = LocalTTLCache(maxsize=int(os.getenv('PRODUCT_DETAIL_CACHE_SIZE', 1000)),
+                                     generation=cache.generation)
+
+
+# Поля ответа productDetailV3, которые использует ручной поиск
+_PRODUCT_DETAIL_FIELDS = ('title', 'brandName', 'images', 'articleNumber')
+
+
+def get_product_detail_cached(spu_id: int) -> Optional[Dict]:
+    """
+    get_product_detail_v3 с кэшем в памяти процесса (неудачные ответы не кэшируются).
+    
+    Хранятся только поля _PRODUCT_DETAIL_FIELDS: полный ответ (размеры, свойства,
+    изображения по цветам) во много раз больше, а кэш держит до тысячи товаров.
+    """
+    product_detail = product_detail_cache.get(spu_id)
+    if product_detail is None:
+        full_detail = poizon_client.get_product_detail_v3(spu_id)
+        if full_detail:
+            product_detail = {field: full_detail[field] for field in _PRODUCT_DETAIL_FIELDS if field in full_detail}
+            product_detail_cache.set(spu_id, product_detail, ttl=PRODUCT_DETAIL_CACHE_TTL)
+    return product_detail
+
+
 @app.route('/api/search/manual', methods=['GET'])
 def manual_search():
     """
@@ -868,9 +1484,9 @@ def manual_search():
             spu_id = int(query)
             logger.info(f"Поиск по SPU ID: {spu_id}")
             
-            product_detail = poizon_client.get_product_detail_v3(spu_id)
+            product_detail = get_product_detail_cached(spu_id)
             
-            if product_detail:
+            if product_detail is not None:
                 logger.info(f"Найден товар по SPU ID")
                 
                 return jsonify({
@@ -895,12 +1511,12 @@ def manual_search():
         
         formatted_products = []
         for product in products:
-            spu_id = product.get('spuId', product.get('productId'))
+            spu_id = _first(product, _SPU_ID_KEYS)
             formatted_products.append({
                 'spuId': spu_id,
                 'sku': str(spu_id),
                 'title': product.get('title', ''),
-                'brand': product.get('brandName', product.get('brand', '')),
+                'brand': _first(product, _BRAND_KEYS, ''),
                 'description': product.get('title', '')[:200],
                 'images': product.get('images', [product.get('logoUrl')]) if product.get('images') else [product.get('logoUrl', '')],
                 'articleNumber': product.get('articleNumber', ''),
@@ -935,8 +1551,15 @@ def get_cache_stats():
 
 @app.route('/api/cache/clear', methods=['POST'])
 def clear_cache_endpoint():
-    """Очистить весь кэш"""
+    """
+    Очистить весь кэш.
+    
+    Redis очищается сразу, кэш в памяти этого воркера - тоже; остальные воркеры
+    сбрасывают свой при следующем обращении (не позже GENERATION_CHECK_INTERVAL).
+    """
     cache.clear()
+    local_cache.clear()
+    product_detail_cache.clear()
     return jsonify({
         'success': True,
         'message': 'Кэш очищен'
@@ -999,33 +1622,39 @@ def get_products():
         start_page = page * pages_per_batch  # Начальная страница для этого батча
         is_last_batch = False  # Флаг: достигли конца данных API
         
-        for p in range(start_page, start_page + pages_per_batch):
-            products_page = poizon_client.search_products(keyword=keyword, limit=100, page=p)
-            
+        def fetch_page(p: int) -> List[Dict]:
+            return poizon_client.search_products(keyword=keyword, limit=100, page=p)
+        
+        # Сначала одна страница: если она неполная, остальные запрашивать незачем.
+        # Иначе оставшиеся страницы батча загружаем параллельно
+        first_page = fetch_page(start_page)
+        if first_page and len(first_page) >= 100:
+            rest_pages = range(start_page + 1, start_page + pages_per_batch)
+            with ThreadPoolExecutor(max_workers=SEARCH_PARALLEL) as executor:
+                pages = [(start_page, first_page)] + list(zip(rest_pages, executor.map(fetch_page, rest_pages)))
+        else:
+            pages = [(start_page, first_page)]
+        
+        # Склеиваем по порядку до первой пустой/неполной страницы
+        for p, products_page in pages:
             if not products_page or len(products_page) == 0:
-                logger.info(f"  API страница {p}: пустая, останавливаем загрузку")
+                logger.info("  API страница %d: пустая, останавливаем загрузку", p)
                 is_last_batch = True
                 break
             
             all_products.extend(products_page)
-            logger.info(f"  API страница {p}: найдено {len(products_page)} товаров")
+            logger.info("  API страница %d: найдено %d товаров", p, len(products_page))
             
             # Если API вернул меньше 100 товаров - это последняя страница
             if len(products_page) < 100:
-                logger.info(f"  Получена последняя API страница (товаров < 100)")
+                logger.info("  Получена последняя API страница (товаров < 100)")
                 is_last_batch = True
                 break
         
         logger.info(f"ВСЕГО загружено из API: {len(all_products)} товаров (страницы {start_page}-{start_page + pages_per_batch - 1})")
         
         # Дедупликация
-        unique_products = {}
-        for product in all_products:
-            spu_id = product.get('spuId', product.get('productId'))
-            if spu_id and spu_id not in unique_products:
-                unique_products[spu_id] = product
-        
-        products = list(unique_products.values())
+        products = dedupe_products(all_products)
         logger.info(f"Уникальных товаров: {len(products)}")
         
         # Фильтруем по категории (если указан category_id)
@@ -1033,35 +1662,34 @@ def get_products():
             products = filter_products_by_category(products, category_id)
             logger.info(f"После фильтрации по категории: {len(products)}")
         
-        # Форматируем результаты
-        formatted_products = []
-        for product in products:
-            spu_id = product.get('spuId', product.get('productId'))
-            
-            formatted_products.append({
-                'spuId': spu_id,
-                'sku': str(spu_id),
-                'title': product.get('title', ''),
-                'brand': brand,
-                'category': category,
-                'description': product.get('title', '')[:200],
-                'images': product.get('images', [product.get('logoUrl')]) if product.get('images') else [product.get('logoUrl', '')],
-                'articleNumber': product.get('articleNumber', ''),
-                'price': product.get('price', 0)
-            })
+        # Форматируем результаты (по одному товару, прямо при отправке ответа)
+        def format_products():
+            for product in products:
+                spu_id = _first(product, _SPU_ID_KEYS)
+                
+                yield {
+                    'spuId': spu_id,
+                    'sku': str(spu_id),
+                    'title': product.get('title', ''),
+                    'brand': brand,
+                    'category': category,
+                    'description': product.get('title', '')[:200],
+                    'images': product.get('images', [product.get('logoUrl')]) if product.get('images') else [product.get('logoUrl', '')],
+                    'articleNumber': product.get('articleNumber', ''),
+                    'price': product.get('price', 0)
+                }
         
         # Определяем, есть ли еще товары
         # Если достигли конца API данных (последняя страница или пустой ответ), то has_more=False
         has_more = not is_last_batch
         
-        logger.info(f"Возвращаем товаров: {len(formatted_products)}, has_more={has_more}")
-        return jsonify({
+        logger.info(f"Возвращаем товаров: {len(products)}, has_more={has_more}")
+        return stream_json_list({
             'success': True,
-            'products': formatted_products,
-            'total': len(formatted_products),
+            'total': len(products),
             'page': page,
             'has_more': has_more  # Есть ли еще товары для загрузки
-        })
+        }, 'products', format_products())
         
     except Exception as e:
         logger.error(f"Ошибка получения товаров: {e}")
@@ -1199,13 +1827,13 @@ def get_wordpress_categories():
             })
         
         # Сортируем по пути
-        categories.sort(key=lambda x: x['path'])
+        categories.sort(key=itemgetter('path'))
         
         logger.info(f"Отправлено категорий: {len(categories)}")
-        return jsonify({
+        return _json_body_response(json_codec.dumps({
             'success': True,
             'categories': categories
-        })
+        }), max_age=WP_CATEGORIES_MAX_AGE)
         
     except Exception as e:
         logger.error(f"Ошибка получения категорий: {e}")
@@ -1215,6 +1843,27 @@ def get_wordpress_categories():
         }), 500
 
 
+def wp_product_summary(product: Dict) -> Dict:
+    """
+    Легковесное описание товара WordPress для списка обновления.
+    
+    Агрегаты по вариациям берутся из ответа списка товаров (WooCommerce
+    отдает ID вариаций и минимальную цену в самом товаре), поэтому отдельные
+    запросы /variations на каждый товар не нужны.
+    """
+    images = product.get('images')
+    return {
+        'id': product['id'],
+        'sku': product.get('sku', ''),
+        'name': product.get('name', ''),
+        'image': images[0].get('src', '') if images else '',
+        'date_created': product.get('date_created', ''),
+        'date_modified': product.get('date_modified', ''),
+        'variations_count': len(product.get('variations') or ()),
+        'price': product.get('price', ''),
+    }
+
+
 @app.route('/api/wordpress/products', methods=['GET'])
 def get_wordpress_products():
     """
@@ -1251,10 +1900,8 @@ def get_wordpress_products():
                 # Запрос одного товара
                 url = f"{woocommerce_client.url}/wp-json/wc/v3/products/{product_id_int}"
                 
-                response = requests.get(
+                response = woocommerce_client.session.get(
                     url,
-                    auth=woocommerce_client.auth,
-                    verify=False,
                     timeout=30
                 )
                 
@@ -1265,7 +1912,7 @@ def get_wordpress_products():
                     }), 404
                 
                 response.raise_for_status()
-                product = response.json()
+                product = json_codec.loads(response.content)
                 
                 # Проверяем что это вариативный товар
                 if product.get('type') != 'variable':
@@ -1276,19 +1923,9 @@ def get_wordpress_products():
                 
                 logger.info(f"Найден товар: {product.get('name')}")
                 
-                # Формируем ответ для одного товара
-                result_product = {
-                    'id': product['id'],
-                    'sku': product.get('sku', ''),
-                    'name': product.get('name', ''),
-                    'image': product.get('images', [{}])[0].get('src', '') if product.get('images') else '',
-                    'date_created': product.get('date_created', ''),
-                    'date_modified': product.get('date_modified', ''),
-                }
-                
                 return jsonify({
                     'success': True,
-                    'products': [result_product],
+                    'products': [wp_product_summary(product)],
                     'pagination': {
                         'current_page': 1,
                         'per_page': 1,
@@ -1304,9 +1941,7 @@ def get_wordpress_products():
                 }), 400
         
         # Обычный поиск со списком товаров
-        selected_category_ids = []
-        if category_filter:
-            selected_category_ids = [int(c.strip()) for c in category_filter.split(',') if c.strip().isdigit()]
+        selected_category_ids = {int(c) for c in map(str.strip, category_filter.split(',')) if c.isdigit()}
         
         logger.info(f"Запрос товаров WordPress: page={page}, per_page={per_page}, categories={selected_category_ids}")
         
@@ -1321,7 +1956,7 @@ def get_wordpress_products():
         }
         
         if selected_category_ids:
-            params['category'] = ','.join(map(str, selected_category_ids))
+            params['category'] = ','.join(map(str, sorted(selected_category_ids)))
         
         if date_created_after:
             params['after'] = date_created_after + 'T00:00:00'
@@ -1329,33 +1964,21 @@ def get_wordpress_products():
         # Запрос к WordPress API
         url = f"{woocommerce_client.url}/wp-json/wc/v3/products"
         
-        response = requests.get(
+        response = woocommerce_client.session.get(
             url,
-            auth=woocommerce_client.auth,
             params=params,
-            verify=False,
             timeout=30
         )
         response.raise_for_status()
         
-        products = response.json()
+        products = json_codec.loads(response.content)
         total_pages = int(response.headers.get('X-WP-TotalPages', 1))
         total_filtered = int(response.headers.get('X-WP-Total', 0))
         
         logger.info(f"Получено товаров: {len(products)}, всего: {total_filtered}, страниц: {total_pages}")
         
         # Формируем легковесный ответ (БЕЗ загрузки вариаций!)
-        result_products = []
-        for product in products:
-            result_products.append({
-                'id': product['id'],
-                'sku': product.get('sku', ''),
-                'name': product.get('name', ''),
-                'image': product.get('images', [{}])[0].get('src', '') if product.get('images') else '',
-                'date_created': product.get('date_created', ''),
-                'date_modified': product.get('date_modified', ''),
-                # Информацию о вариациях получим при обновлении
-            })
+        result_products = [wp_product_summary(product) for product in products]
         
         return jsonify({
             'success': True,
@@ -1395,9 +2018,16 @@ def update_prices_and_stock():
         JSON с session_id для подключения к SSE
     """
     try:
-        data = request.get_json()
-        product_ids = data.get('product_ids', [])
-        settings_data = data.get('settings', {})
+        data = request.get_json(silent=True) or {}
+        settings_data = data.get('settings') or {}
+        
+        try:
+            product_ids = [int(pid) for pid in data.get('product_ids') or ()]
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'product_ids должен быть списком чисел'
+            }), 400
         
         if not product_ids:
             return jsonify({
@@ -1405,11 +2035,11 @@ def update_prices_and_stock():
                 'error': 'Не выбраны товары'
             }), 400
         
-        # Генерируем уникальный session_id
-        session_id = str(uuid.uuid4())
-        
-        # Создаем очередь для этой сессии
-        progress_queues[session_id] = queue.Queue()
+        if not isinstance(settings_data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'settings должен быть объектом'
+            }), 400
         
         # Создаем настройки
         settings = SyncSettings(
@@ -1417,215 +2047,19 @@ def update_prices_and_stock():
             markup_rubles=settings_data.get('markup_rubles', 5000)
         )
         
+        # Запрос валиден - только теперь генерируем session_id и регистрируем сессию прогресса
+        session_id = uuid.uuid4().hex
+        progress.open_session(session_id)
+        
         logger.info(f"Обновление цен: товаров={len(product_ids)}, курс={settings.currency_rate}, наценка={settings.markup_rubles}₽")
         
-        # Запускаем обновление в отдельном потоке
-        def update_prices_thread():
-            results = []
-            updated_count = 0
-            error_count = 0
-            
-            try:
-                # Отправляем начальное сообщение
-                progress_queues[session_id].put({
-                    'type': 'start',
-                    'total': len(product_ids),
-                    'message': f'Начинаем обновление {len(product_ids)} товаров...'
-                })
-                
-                for idx, wc_product_id in enumerate(product_ids, 1):
-                    # Отправляем событие начала обработки товара
-                    progress_queues[session_id].put({
-                        'type': 'product_start',
-                        'current': idx,
-                        'total': len(product_ids),
-                        'product_id': wc_product_id,
-                        'message': f'[{idx}/{len(product_ids)}] Обработка товара ID {wc_product_id}...'
-                    })
-                    
-                    try:
-                        # Получаем товар из WordPress
-                        progress_queues[session_id].put({
-                            'type': 'status_update',
-                            'message': f'  → Загрузка товара из WordPress...'
-                        })
-                        
-                        url = f"{woocommerce_client.url}/wp-json/wc/v3/products/{wc_product_id}"
-                        response = requests.get(url, auth=woocommerce_client.auth, verify=False, timeout=30)
-                        response.raise_for_status()
-                        wc_product = response.json()
-                        
-                        sku = wc_product.get('sku', '')
-                        product_name = wc_product.get('name', '')
-                        
-                        logger.info(f"Товар WordPress ID {wc_product_id}: SKU='{sku}', Название='{product_name}'")
-                        
-                        # ВАЖНО: Ищем сохраненный spuId в meta_data (надежнее чем поиск!)
-                        spu_id = None
-                        meta_data = wc_product.get('meta_data', [])
-                        for meta in meta_data:
-                            if meta.get('key') == '_poizon_spu_id':
-                                spu_id = int(meta.get('value'))
-                                logger.info(f"  Найден сохраненный spuId: {spu_id}")
-                                break
-                        
-                        # Если spuId не найден в meta_data - пробуем по SKU (fallback)
-                        if not spu_id:
-                            if not sku:
-                                progress_queues[session_id].put({
-                                    'type': 'product_done',
-                                    'current': idx,
-                                    'status': 'error',
-                                    'message': f'SKU и spuId не найдены'
-                                })
-                                results.append({'product_id': wc_product_id, 'status': 'error', 'message': 'SKU не найден'})
-                                error_count += 1
-                                continue
-                            
-                            # Ищем товар в Poizon по SKU (fallback)
-                            progress_queues[session_id].put({
-                                'type': 'status_update',
-                                'message': f'  → Поиск в Poizon по SKU {sku}...'
-                            })
-                            
-                            search_results = poizon_client.search_products(sku, limit=1)
-                            
-                            logger.info(f"Fallback: поиск по SKU '{sku}' - найдено={len(search_results) if search_results else 0}")
-                            
-                            if not search_results or len(search_results) == 0:
-                                progress_queues[session_id].put({
-                                    'type': 'product_done',
-                                    'current': idx,
-                                    'status': 'error',
-                                    'message': f'[{idx}/{len(product_ids)}] Товар не найден в Poizon'
-                                })
-                                results.append({'product_id': wc_product_id, 'status': 'error', 'message': 'Товар не найден в Poizon'})
-                                error_count += 1
-                                continue
-                            
-                            spu_id = search_results[0].get('spuId')
-                            logger.warning(f"  Используем spuId из поиска: {spu_id} (может быть неточно!)")
-                            
-                            # Сохраняем spuId в meta_data для будущих обновлений
-                            try:
-                                update_url = f"{woocommerce_client.url}/wp-json/wc/v3/products/{wc_product_id}"
-                                update_data = {
-                                    'meta_data': [{'key': '_poizon_spu_id', 'value': str(spu_id)}]
-                                }
-                                requests.put(update_url, auth=woocommerce_client.auth, json=update_data, verify=False, timeout=30)
-                                logger.info(f"  Сохранен spuId в meta_data для будущих обновлений")
-                            except:
-                                pass  # Не критично если не удалось
-                        else:
-                            logger.info(f"  Используем сохраненный spuId: {spu_id} (надежно!)")
-                        
-                        # ОПТИМИЗАЦИЯ: Обновляем только цены и остатки (без полной загрузки товара!)
-                        progress_queues[session_id].put({
-                            'type': 'status_update',
-                            'message': f'  → Загрузка цен из Poizon (SPU: {spu_id})...'
-                        })
-                        
-                        # Используем быстрый метод - только цены и остатки, без изображений/переводов/категорий
-                        updated = woocommerce_client.update_product_prices_only(
-                            wc_product_id,
-                            spu_id,
-                            settings.currency_rate,
-                            settings.markup_rubles,
-                            poizon_client  # Передаем клиент Poizon
-                        )
-                        
-                        if updated < 0:  # Ошибка получения цен
-                            progress_queues[session_id].put({
-                                'type': 'product_done',
-                                'current': idx,
-                                'status': 'error',
-                                'message': f'[{idx}/{len(product_ids)}] Не удалось получить цены'
-                            })
-                            results.append({'product_id': wc_product_id, 'status': 'error', 'message': 'Не удалось получить цены'})
-                            error_count += 1
-                            continue
-                        
-                        # Обновляем вариации
-                        progress_queues[session_id].put({
-                            'type': 'status_update',
-                            'message': f'  → Обновление цен и остатков в WordPress...'
-                        })
-                        
-                        if updated > 0:
-                            progress_queues[session_id].put({
-                                'type': 'status_update',
-                                'message': f'  → Успешно обновлено {updated} вариаций'
-                            })
-                            
-                            progress_queues[session_id].put({
-                                'type': 'product_done',
-                                'current': idx,
-                                'status': 'completed',
-                                'message': f'[{idx}/{len(product_ids)}] {product_name}: обновлено {updated} вариаций'
-                            })
-                            results.append({
-                                'product_id': wc_product_id,
-                                'product_name': product_name,
-                                'status': 'completed',
-                                'message': f'Обновлено вариаций: {updated}'
-                            })
-                            updated_count += 1
-                        else:
-                            progress_queues[session_id].put({
-                                'type': 'product_done',
-                                'current': idx,
-                                'status': 'warning',
-                                'message': f'[{idx}/{len(product_ids)}] {product_name}: SKU не совпадают'
-                            })
-                            results.append({
-                                'product_id': wc_product_id,
-                                'status': 'warning',
-                                'message': 'Нет совпадающих вариаций'
-                            })
-                        
-                        # Пауза для соблюдения rate limits
-                        time.sleep(2)
-                    
-                    except Exception as e:
-                        logger.error(f"Ошибка обновления товара {wc_product_id}: {e}")
-                        progress_queues[session_id].put({
-                            'type': 'product_done',
-                            'current': idx,
-                            'status': 'error',
-                            'message': f'[{idx}/{len(product_ids)}] Ошибка: {str(e)}'
-                        })
-                        results.append({
-                            'product_id': wc_product_id,
-                            'status': 'error',
-                            'message': str(e)
-                        })
-                        error_count += 1
-                
-                # Отправляем финальное сообщение
-                progress_queues[session_id].put({
-                    'type': 'complete',
-                    'results': results,
-                    'total': len(results),
-                    'updated': updated_count,
-                    'errors': error_count,
-                    'message': f'Готово! Обновлено: {updated_count}, Ошибок: {error_count}'
-                })
-                
-                # Сигнал завершения
-                progress_queues[session_id].put('DONE')
-                
-            except Exception as e:
-                logger.error(f"Критическая ошибка в потоке обновления: {e}")
-                if session_id in progress_queues:
-                    progress_queues[session_id].put({
-                        'type': 'error',
-                        'message': f'Критическая ошибка: {str(e)}'
-                    })
-                    progress_queues[session_id].put('DONE')
-        
-        # Запускаем поток
-        thread = threading.Thread(target=update_prices_thread, daemon=True)
-        thread.start()
+        # Товары обрабатываются задачами Celery параллельно на всех воркерах;
+        # прогресс идет через Redis и читается эндпоинтом /api/progress из любого процесса
+        start_price_update_task.delay(
+            product_ids,
+            {'currency_rate': settings.currency_rate, 'markup_rubles': settings.markup_rubles},
+            session_id
+        )
         
         # Сразу возвращаем session_id клиенту
         return jsonify({
@@ -1642,6 +2076,50 @@ def update_prices_and_stock():
         }), 500
 
 
+@app.route('/api/progress/<session_id>', methods=['GET'])
+def stream_progress(session_id: str):
+    """
+    SSE поток прогресса обновления цен.
+    
+    Args:
+        session_id: ID сессии из /api/update-prices
+        
+    Returns:
+        text/event-stream с JSON событиями; завершается событием {"type": "done"}
+    """
+    if not progress.is_active(session_id):
+        return jsonify({
+            'success': False,
+            'error': 'Сессия не найдена'
+        }), 404
+    
+    def generate():
+        try:
+            last_id = progress.FIRST_ID
+            while True:
+                entries = progress.read_raw(session_id, last_id, timeout=PROGRESS_KEEPALIVE_SECONDS)
+                if not entries:
+                    # Комментарий SSE - держит соединение открытым через прокси
+                    yield _SSE_KEEPALIVE
+                    continue
+                
+                # События уже сериализованы продюсером - отдаем байты как есть
+                for last_id, raw in entries:
+                    if raw == progress.DONE_RAW:
+                        yield _SSE_DONE
+                        return
+                    yield b'data: ' + raw + b'\n\n'
+        finally:
+            # Закрытие сессии (в т.ч. при отключении клиента) останавливает оставшиеся задачи
+            progress.close_session(session_id)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 # ============================================================================
 # ЗАПУСК ПРИЛОЖЕНИЯ
 # ============================================================================
@@ -1655,8 +2133,8 @@ if __name__ == '__main__':
             logger.info("ЗАПУСК ВЕБ-ПРИЛОЖЕНИЯ POIZON → WORDPRESS")
             logger.info("="*70)
         
-        # Инициализация сервисов
-        init_services()
+        # Инициализация сервисов и прогрев кэша ответов
+        init_app_services()
         
         # Запуск Flask
         port = int(os.getenv('WEB_APP_PORT', 5000))